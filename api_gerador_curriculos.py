@@ -1,39 +1,102 @@
 import os
+import asyncio
 from typing import Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Security
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Security, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi import APIRouter, status
 from pydantic import BaseModel, EmailStr
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+from contextlib import asynccontextmanager
+from database import database
 from dotenv import load_dotenv
 from email.message import EmailMessage
-from aiosmtplib import send
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-import openai
-import uvicorn
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-from datetime import datetime, timedelta
+from password_hashing import password_hasher
+from cache_utils import TTLLRUCache
+from llm_client import llm_client, LLMRateLimitError, CircuitOpenError
+from pdf_renderer import pdf_renderer
+from resume_store import ResumeStore, input_hash
+from mongo_indexes import IndexManager, register_curriculos
+from listing import LISTAGEM_LIMITE_PADRAO, export_response, paginate
+from json_response import ORJSONResponse
+from metrics import MetricsMiddleware, metrics_response
+from auth import decode_token, encode_token
+from datetime import timedelta
+from urllib.parse import quote
 from fastapi.security import OAuth2PasswordBearer
 
 load_dotenv()
-MONGO_URI = os.getenv('MONGO_URI')
-DB_NAME = os.getenv('DATABASE_NAME')
 SMTP_USER = os.getenv('SMTP_MAIL')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
 SMTP_HOST = os.getenv('SMTP_HOST')
 SMTP_PORT = int(os.getenv('SMTP_PORT'))
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+CURRICULO_SECOES = [secao.strip() for secao in os.getenv('CURRICULO_SECOES', 'experiencia,habilidades,educacao,projetos').split(',') if secao.strip()]
+CURRICULO_SECAO_TIMEOUT = float(os.getenv('CURRICULO_SECAO_TIMEOUT', 20))
+CAMPOS_USUARIO = {"_id": 0, "email": 1, "name": 1, "jobtitle": 1, "location": 1}
+# `users` é compartilhada com o recrutamento; só os cadastros daqui têm `jobtitle`.
+USUARIOS_CURRICULOS = {"jobtitle": {"$exists": True}}
 
-client = AsyncIOMotorClient(MONGO_URI)
-db = client[DB_NAME]
+PROMPTS_SECOES = {
+    "experiencia": "Generate work experience details for {name}.",
+    "habilidades": "Generate skills for {jobtitle}.",
+    "educacao": "Generate a short education section for {name}, a {jobtitle}.",
+    "projetos": "Generate a short list of technical projects for {name}, a {jobtitle}.",
+}
+SECOES_PADRAO = {
+    "experiencia": "Experiência não fornecida.",
+    "habilidades": "Habilidades não fornecidas.",
+    "educacao": "Educação não fornecida.",
+    "projetos": "Projetos não fornecidos.",
+}
 
-app = FastAPI(title="API reborn Xboot- linkdin Resume generater", version="1.0.0")
-router = APIRouter()
+db = database.get_database()
+index_manager = IndexManager(db)
+register_curriculos(index_manager)
+user_cache = TTLLRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+resume_store = ResumeStore(db.curriculos)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await database.connect()
+    await index_manager.bootstrap()
+    await llm_client.start()
+    password_hasher.start()
+    pdf_renderer.start()
+    yield
+    password_hasher.close()
+    await llm_client.close()
+    pdf_renderer.close()
+    database.close()
+
+app = FastAPI(
+    title="API reborn Xboot- linkdin Resume generater",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+app.add_middleware(MetricsMiddleware, app_name="curriculos")
+router = APIRouter(default_response_class=ORJSONResponse)
+ops_router = APIRouter(default_response_class=ORJSONResponse)
+
+@ops_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return metrics_response()
+
+@ops_router.get("/db/stats")
+async def db_stats():
+    return database.stats()
+
+@router.get("/pdf/stats")
+async def pdf_stats():
+    return pdf_renderer.stats()
+
+@ops_router.get("/llm/stats")
+async def llm_stats():
+    return llm_client.stats()
 
 class UserBase(BaseModel):
     name: str
@@ -45,50 +108,54 @@ class UserBase(BaseModel):
 class UserInDB(UserBase):
     hashed_password: str
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+class UserPublic(BaseModel):
+    name: str
+    email: EmailStr
+    jobtitle: Optional[str] = None
+    location: Optional[str] = None
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
-def criar_curriculo_pdf(nome, local, telefone, email, experiencia, habilidades, educacao, projetos, caminho_arquivo):
-    pdf = canvas.Canvas(caminho_arquivo, pagesize=letter)
-    pdf.setTitle(f"Currículo de {nome}")
-
-    margem_esquerda, margem_superior, linha_espaco = 100, 750, 20
-
-    pdf.setFont("Helvetica-Bold", 20)
-    pdf.drawString(margem_esquerda, margem_superior, nome)
-
-    pdf.setFont("Helvetica", 12)
-    pdf.drawString(margem_esquerda, margem_superior - linha_espaco, f"{local} – {telefone} – {email}")
-
-    def adicionar_secao(titulo, conteudo, y_pos):
-        pdf.setFont("Helvetica-Bold", 14)
-        pdf.drawString(margem_esquerda, y_pos, titulo)
-        pdf.setFont("Helvetica", 12)
-        text = pdf.beginText(margem_esquerda, y_pos - linha_espaco)
-        text.textLines(conteudo)
-        pdf.drawText(text)
-
-    adicionar_secao("Experiência Profissional:", experiencia, margem_superior - linha_espaco * 3)
-    adicionar_secao("Habilidades e Interesses:", habilidades, margem_superior - linha_espaco * 8)
-    adicionar_secao("Educação:", educacao, margem_superior - linha_espaco * 12)
-    adicionar_secao("Projetos Técnicos:", projetos, margem_superior - linha_espaco * 16)
+async def gerar_conteudo_openai(prompt: str) -> str:
+    try:
+        response = await llm_client.chat_completion([{"role": "user", "content": prompt}])
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Serviço de IA temporariamente indisponível.")
+    except LLMRateLimitError:
+        raise HTTPException(status_code=429, detail="Limite de taxa do OpenAI excedido. Tente novamente mais tarde.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro na API do OpenAI: {str(e)}")
+    return response.strip()
 
-    pdf.save()
+async def gerar_secao(secao: str, curriculo: "UserBase") -> Optional[str]:
+    prompt = PROMPTS_SECOES[secao].format(name=curriculo.name, jobtitle=curriculo.jobtitle)
+    try:
+        return await asyncio.wait_for(gerar_conteudo_openai(prompt), CURRICULO_SECAO_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"Tempo esgotado ao gerar a seção '{secao}' do currículo.")
+    except HTTPException as e:
+        print(f"Erro ao gerar a seção '{secao}' do currículo: {e.detail}")
+    return None
 
-async def gerar_conteudo_openai(prompt: str) -> str:
-    openai.api_key = OPENAI_API_KEY
-    response = openai.ChatCompletion.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message.content.strip()
+async def gerar_secoes(curriculo: "UserBase") -> tuple:
+    secoes = [secao for secao in CURRICULO_SECOES if secao in PROMPTS_SECOES]
+    resultados = await asyncio.gather(*(gerar_secao(secao, curriculo) for secao in secoes))
+    conteudo = dict(SECOES_PADRAO)
+    falhas = []
+    for secao, resultado in zip(secoes, resultados):
+        if resultado is None:
+            falhas.append(secao)
+        else:
+            conteudo[secao] = resultado
+    if secoes and len(falhas) == len(secoes):
+        raise HTTPException(status_code=503, detail="Não foi possível gerar o currículo. Tente novamente mais tarde.")
+    return conteudo, falhas
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -96,73 +163,124 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Não pôde validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        user = await db.users.find_one({"email": email})
+    payload = decode_token(token, ALGORITHM)
+    email: str = payload.get("sub") if payload else None
+    if email is None:
+        raise credentials_exception
+    user = user_cache.get(email)
+    if user is None:
+        user = await db.users.find_one({"email": email, **USUARIOS_CURRICULOS}, CAMPOS_USUARIO)
         if user is None:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        user_cache.set(email, user, payload.get("exp"))
     return user
 
-@app.post("/register/")
+@ops_router.get("/cache/users")
+async def user_cache_stats():
+    return user_cache.stats()
+
+@router.get("/users/me/", response_model=UserPublic)
+async def read_users_me(current_user: dict = Depends(get_current_user)):
+    return ORJSONResponse(current_user)
+
+@router.post("/register/")
 async def register_user(user: UserBase):
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     user_dict = user.dict()
     user_dict["hashed_password"] = hashed_password
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="E-mail já cadastrado.")
+    user_cache.invalidate(user.email)
     return JSONResponse(content={"detail": "Usuário registrado com sucesso."}, status_code=201)
 
-@app.post("/token/")
+@router.post("/token/")
 async def login(user: UserBase):
-    db_user = await db.users.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["hashed_password"]):
+    db_user = await db.users.find_one({"email": user.email, **USUARIOS_CURRICULOS}, {"hashed_password": 1})
+    if not db_user:
+        raise HTTPException(status_code=400, detail="Credenciais inválidas")
+    valid, new_hash = await password_hasher.verify_and_update(user.password, db_user["hashed_password"])
+    if not valid:
         raise HTTPException(status_code=400, detail="Credenciais inválidas")
+    if new_hash:
+        await db.users.update_one({"_id": db_user["_id"]}, {"$set": {"hashed_password": new_hash}})
+        user_cache.invalidate(user.email)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
     return {"access_token": access_token, "token_type": "bearer"}
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-
-@app.post("/activate/")
+    return encode_token(data, expires_delta or timedelta(minutes=15), ALGORITHM)
+
+@router.post("/activate/")
 async def activate_account(email: EmailStr, code: str):
-    user = await db.users.find_one({"email": email})
-    if not user or user["activation_code"] != code:
+    user = await db.users.find_one({"email": email, **USUARIOS_CURRICULOS}, {"activation_code": 1})
+    if not user or user.get("activation_code") != code:
         raise HTTPException(status_code=400, detail="Código de ativação inválido.")
     
-    await db.users.update_one({"email": email}, {"$set": {"is_active": True}})
+    await db.users.update_one({"email": email, **USUARIOS_CURRICULOS}, {"$set": {"is_active": True}})
+    user_cache.invalidate(email)
     return JSONResponse(content={"detail": "Conta ativada com sucesso."})
 
-@app.post("/curriculo/generate/")
-async def gerar_curriculo(curriculo: UserBase, background_tasks: BackgroundTasks, current_user: UserBase = Depends(get_current_user)):
-    experiencia = await gerar_conteudo_openai(f"Generate work experience details for {curriculo.name}.")
-    habilidades = await gerar_conteudo_openai(f"Generate skills for {curriculo.jobtitle}.")
-    
-    caminho_arquivo = f"{curriculo.name}_curriculo.pdf"
-    criar_curriculo_pdf(
-        curriculo.name, curriculo.location or "N/A", "N/A", curriculo.email, 
-        experiencia, habilidades, "Educação não fornecida.", "Projetos não fornecidos.", caminho_arquivo
-    )
-    await db.curriculos.insert_one(curriculo.dict())
-    return FileResponse(caminho_arquivo, media_type='application/pdf', filename=caminho_arquivo)
+@router.post("/curriculo/generate/")
+async def gerar_curriculo(curriculo: UserBase, request: Request, background_tasks: BackgroundTasks, regenerar: bool = False, current_user: UserBase = Depends(get_current_user)):
+    nome_arquivo = f"{curriculo.name}_curriculo.pdf"
+    entrada_hash = input_hash({
+        "name": curriculo.name, "location": curriculo.location, "email": curriculo.email, "jobtitle": curriculo.jobtitle,
+        "secoes": {secao: PROMPTS_SECOES.get(secao) for secao in CURRICULO_SECOES},
+    })
+    if not regenerar:
+        documento = await resume_store.find_by_input(entrada_hash)
+        if documento is not None:
+            return resume_store.response(request, documento, nome_arquivo, {"X-Cache": "HIT"})
+
+    secoes, falhas = await gerar_secoes(curriculo)
+
+    pdf, render_seconds = await pdf_renderer.render({
+        "nome": curriculo.name, "local": curriculo.location or "N/A", "telefone": "N/A", "email": curriculo.email,
+        **secoes,
+    })
+    documento = await resume_store.save(entrada_hash, pdf, {
+        "nome": curriculo.name, "email": curriculo.email, "jobtitle": curriculo.jobtitle, "location": curriculo.location,
+        "secoes": secoes, "parcial": bool(falhas),
+    })
+    return Response(content=pdf, media_type='application/pdf', headers={
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(nome_arquivo)}",
+        "ETag": f'"{documento["content_hash"]}"',
+        "X-Cache": "MISS",
+        "X-Render-Time": f"{render_seconds:.4f}",
+        "X-Secoes-Padrao": ",".join(falhas),
+    })
 
-@app.get("/curriculo/{nome}/")
-async def obter_curriculo(nome: str, current_user: UserBase = Depends(get_current_user)):
-    curriculo = await db.curriculos.find_one({"nome": nome})
+@router.get("/curriculo/{nome}/")
+async def obter_curriculo(nome: str, request: Request, current_user: UserBase = Depends(get_current_user)):
+    curriculo = await resume_store.find_latest({"nome": nome})
     if not curriculo:
         raise HTTPException(status_code=404, detail="Currículo não encontrado.")
-    return curriculo
+    return resume_store.response(request, curriculo, f"{nome}_curriculo.pdf")
+
+CAMPOS_CURRICULO = {"nome": 1, "email": 1, "jobtitle": 1, "location": 1, "content_hash": 1, "tamanho": 1, "parcial": 1, "criado_em": 1}
+
+@router.get("/curriculos/")
+async def listar_curriculos(
+    nome: Optional[str] = None, cursor: Optional[str] = None, limite: int = LISTAGEM_LIMITE_PADRAO,
+    current_user: UserBase = Depends(get_current_user),
+):
+    filtro = {"nome": nome} if nome else {}
+    return await paginate(db.curriculos, filtro, CAMPOS_CURRICULO, cursor, limite)
+
+@router.get("/curriculos/exportar")
+async def exportar_curriculos(
+    formato: str = "ndjson", nome: Optional[str] = None, current_user: UserBase = Depends(get_current_user)
+):
+    filtro = {"nome": nome} if nome else {}
+    return export_response(db.curriculos, filtro, list(CAMPOS_CURRICULO), formato, "curriculos")
+
+app.include_router(router)
+app.include_router(ops_router)
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
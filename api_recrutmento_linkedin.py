@@ -1,37 +1,63 @@
 import os
 import secrets
+from contextlib import asynccontextmanager
 from typing import Optional, List
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi import APIRouter
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
 from email.message import EmailMessage
-from aiohttp import ClientSession
-from motor.motor_asyncio import AsyncIOMotorClient
+from llm_client import llm_client, OPENAI_MODEL
+from password_hashing import password_hasher
+from cache_utils import TTLLRUCache
+from sentiment import SentimentEngine, batch_sentiment_prompt
+from review_batch import AVALIACOES_LOTE_MAX, ReviewImporter, iter_list, iter_ndjson
+from company_reputation import CompanyReputation
+from listing import LISTAGEM_LIMITE_PADRAO, export_response, paginate
+from json_response import ORJSONResponse
+from metrics import MetricsMiddleware, metrics_response
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from generation_cache import GenerationCache, GENERATION_CACHE_MONGO, display_list, normalize_list, normalize_text
+from job_search import job_search, SearchError
+from job_alerts import JobAlertMatcher
+from mongo_indexes import IndexManager, register_recrutamento
+from database import database
+from auth import decode_token, encode_token
 from dotenv import load_dotenv
-import jwt
+import json
+import time
 from datetime import datetime, timedelta
-from passlib.hash import bcrypt
 
 load_dotenv()
-app = FastAPI()
-app = FastAPI(title="API reborn Xboot- linkdin recrutmento", version="1.0.0")
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+# Endpoints do processo (métricas, pools, caches de usuário): no app único, main.py os expõe uma vez só.
+ops_router = APIRouter(default_response_class=ORJSONResponse)
 
-MONGO_URI = os.getenv('MONGO_URI')
-DB_NAME = os.getenv('DATABASE_NAME')
-client = AsyncIOMotorClient(MONGO_URI)
-db = client[DB_NAME]
+db = database.get_database()
+index_manager = IndexManager(db)
+register_recrutamento(index_manager)
 
 SMTP_USER = os.getenv('SMTP_MAIL')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
 SMTP_HOST = os.getenv('SMTP_HOST')
 SMTP_PORT = int(os.getenv('SMTP_PORT'))
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 60))
+ADMIN_USERNAMES = {nome.strip() for nome in os.getenv('ADMIN_USERNAMES', '').split(',') if nome.strip()}
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+user_cache = TTLLRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+generation_cache = GenerationCache(collection=db.cache_geracoes if GENERATION_CACHE_MONGO else None)
+job_alert_matcher = JobAlertMatcher(db, search=job_search.search)
+company_reputation = CompanyReputation(db)
+
+CAMPOS_ALERTA = {"email": 1, "palavras_chave": 1, "localizacao": 1, "tipo_trabalho": 1, "setor": 1}
+CAMPOS_AVALIACAO = {"empresa": 1, "comentario": 1, "sentimento": 1, "usuario_id": 1, "criado_em": 1}
+CAMPOS_SUGESTAO = {"titulo": 1, "link": 1, "resumo": 1, "fonte": 1, "score": 1, "atualizado_em": 1}
+CAMPOS_USUARIO = {"_id": 0, "username": 1, "email": 1, "full_name": 1}
+CAMPOS_LOGIN = {"username": 1, "hashed_password": 1}
 
 class MensagemRequest(BaseModel):
     nome: str
@@ -60,65 +86,89 @@ class User(BaseModel):
 class UserInDB(User):
     hashed_password: str
 
+class UserPublic(BaseModel):
+    username: str
+    email: EmailStr
+    full_name: Optional[str] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def hash_password(password: str) -> str:
-    if isinstance(password, bytes):
-        password = password.decode('utf-8')
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, os.getenv('SECRET_KEY'), algorithm="HS256")
+    return encode_token(data, expires_delta or timedelta(minutes=15))
 
-async def gerar_mensagem(nome: str, area: str, habilidades: List[str]) -> str:
-    prompt = (
+def prompt_mensagem(area: str, habilidades: List[str]) -> str:
+    return (
         f"Crie uma mensagem formal para um recrutador explicando o interesse "
-        f"em uma vaga na área de {area}. Destaque: {', '.join(habilidades)}."
+        f"em uma vaga na área de {' '.join(area.split())}. Destaque: {', '.join(display_list(habilidades))}."
     )
+
+def chave_mensagem(area: str, habilidades: List[str]) -> str:
+    """Chave do cache de geração: a mesma área e habilidades, em qualquer ordem ou caixa, reaproveitam a mensagem."""
+    return json.dumps({"area": normalize_text(area), "habilidades": normalize_list(habilidades)}, ensure_ascii=False)
+
+def evento_sse(dados: dict, evento: Optional[str] = None) -> str:
+    prefixo = f"event: {evento}\n" if evento else ""
+    return f"{prefixo}data: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+async def gerar_mensagem(nome: str, area: str, habilidades: List[str]) -> str:
+    messages = [{"role": "user", "content": prompt_mensagem(area, habilidades)}]
     try:
-        async with ClientSession() as session:
-            response = await session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
-                json={"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": prompt}], "temperature": 0.7},
-            )
-            response_data = await response.json()
-            return response_data['choices'][0]['message']['content']
+        return await generation_cache.get_or_generate(
+            chave_mensagem(area, habilidades), OPENAI_MODEL, 0.7, lambda: llm_client.chat_completion(messages, OPENAI_MODEL, 0.7)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na API do OpenAI: {str(e)}")
 
+async def gerar_mensagem_stream(nome: str, area: str, habilidades: List[str]):
+    """Eventos SSE com os deltas do LLM; o texto completo vai para o cache ao final."""
+    chave = chave_mensagem(area, habilidades)
+    cached = await generation_cache.lookup(chave, OPENAI_MODEL, 0.7)
+    if cached is not None:
+        yield evento_sse({"delta": cached})
+        yield evento_sse({"cache": True}, "done")
+        return
+
+    messages = [{"role": "user", "content": prompt_mensagem(area, habilidades)}]
+    partes = []
+    start = time.perf_counter()
+    try:
+        async for delta in llm_client.stream_chat_completion(messages, OPENAI_MODEL, 0.7):
+            partes.append(delta)
+            yield evento_sse({"delta": delta})
+    except Exception as e:
+        yield evento_sse({"detail": f"Erro na API do OpenAI: {str(e)}"}, "error")
+        return
+    await generation_cache.store(chave, OPENAI_MODEL, 0.7, "".join(partes), time.perf_counter() - start)
+    yield evento_sse({"cache": False}, "done")
+
 async def analisar_sentimento(comentario: str) -> str:
     prompt = f"Qual é o sentimento da seguinte avaliação? '{comentario}'"
     try:
-        async with ClientSession() as session:
-            response = await session.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
-                json={"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": prompt}], "temperature": 0.7},
-            )
-            response_data = await response.json()
-            return response_data['choices'][0]['message']['content']
+        return await llm_client.chat_completion([{"role": "user", "content": prompt}], temperature=0.7)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na API do OpenAI: {str(e)}")
 
-async def buscar_no_google(query: str):
-    url = f"https://www.googleapis.com/customsearch/v1?key={os.getenv('GOOGLE_API_KEY')}&cx={os.getenv('GOOGLE_CX')}&q={query}"
-    async with ClientSession() as session:
-        async with session.get(url) as response:
-            return await response.json()
+async def analisar_sentimentos_lote(comentarios: List[str]) -> str:
+    prompt = batch_sentiment_prompt(comentarios)
+    return await llm_client.chat_completion([{"role": "user", "content": prompt}], temperature=0)
+
+sentiment_engine = SentimentEngine(llm_fallback=analisar_sentimento, llm_batch_fallback=analisar_sentimentos_lote)
+
+async def buscar_no_google(query: str, start: int = 1):
+    try:
+        return await job_search.search(query, start)
+    except SearchError as e:
+        raise HTTPException(status_code=e.status if e.status in (429, 504) else 502, detail=f"Erro na busca do Google: {str(e)}")
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -126,35 +176,103 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, os.getenv('SECRET_KEY'), algorithms=["HS256"])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except jwt.PyJWTError:
+    payload = decode_token(token)
+    username: str = payload.get("sub") if payload else None
+    if username is None:
         raise credentials_exception
-    user = await db.users.find_one({"username": username})
+    user = user_cache.get(username)
     if user is None:
-        raise credentials_exception
+        user = await db.users.find_one({"username": username}, CAMPOS_USUARIO)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(username, user, payload.get("exp"))
     return user
 
-@app.post("/register/", response_model=User)
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user["username"] not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores.")
+    return current_user
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await database.connect()
+    await index_manager.bootstrap()
+    await llm_client.start()
+    password_hasher.start()
+    await generation_cache.ensure_indexes()
+    await job_search.start()
+    job_alert_matcher.start()
+    yield
+    await llm_client.close()
+    await job_alert_matcher.stop()
+    await job_search.close()
+    password_hasher.close()
+    database.close()
+
+app = FastAPI(
+    title="API reborn Xboot- linkdin recrutmento",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+app.add_middleware(MetricsMiddleware, app_name="recrutamento")
+
+@ops_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return metrics_response()
+
+@ops_router.get("/db/stats")
+async def db_stats():
+    return database.stats()
+
+@ops_router.get("/llm/stats")
+async def llm_stats():
+    return llm_client.stats()
+
+@router.get("/cache/buscas")
+async def job_search_stats():
+    return job_search.stats()
+
+@router.get("/cache/mensagens")
+async def generation_cache_stats():
+    return generation_cache.stats()
+
+@router.get("/sentiment/stats")
+async def sentiment_stats():
+    return sentiment_engine.stats()
+
+@ops_router.get("/cache/users")
+async def user_cache_stats():
+    return user_cache.stats()
+
+@router.post("/register/", response_model=UserPublic)
 async def register(user: User):
-    user_in_db = await db.users.find_one({"username": user.username})
+    user_in_db = await db.users.find_one({"username": user.username}, {"_id": 1})
     if user_in_db:
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     user_data = user.dict()
     user_data['hashed_password'] = hashed_password
-    await db.users.insert_one(user_data)
+    try:
+        await db.users.insert_one(user_data)
+    except DuplicateKeyError as e:
+        detail = "Email already registered" if "email" in str(e) else "Username already registered"
+        raise HTTPException(status_code=400, detail=detail)
+    user_cache.invalidate(user.username)
     return user
 
-@app.post("/token/", response_model=Token)
+@router.post("/token/", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = await db.users.find_one({"username": form_data.username})
-    if not user or not verify_password(form_data.password, user['hashed_password']):
+    user = await db.users.find_one({"username": form_data.username}, CAMPOS_LOGIN)
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect username or password")
+    valid, new_hash = await password_hasher.verify_and_update(form_data.password, user['hashed_password'])
+    if not valid:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
+    if new_hash:
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"hashed_password": new_hash}})
+        user_cache.invalidate(user['username'])
 
     access_token_expires = timedelta(minutes=30)
     access_token = create_access_token(
@@ -162,45 +280,126 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/users/me/")
+@router.get("/users/me/", response_model=UserPublic)
 async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
+    # O documento já vem projetado (CAMPOS_USUARIO) do Mongo ou do cache: serializa direto.
+    return ORJSONResponse(current_user)
 
-@app.post("/mensagem-recrutador/")
-async def mensagem_recrutador(request: MensagemRequest, current_user: User = Depends(get_current_user)):
+@router.post("/mensagem-recrutador/")
+async def mensagem_recrutador(
+    request: MensagemRequest, stream: bool = Query(False), current_user: User = Depends(get_current_user)
+):
+    if stream:
+        return StreamingResponse(
+            gerar_mensagem_stream(request.nome, request.area, request.habilidades),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     mensagem = await gerar_mensagem(request.nome, request.area, request.habilidades)
     return JSONResponse(content={"mensagem": mensagem})
 
-@app.post("/avaliacao/")
+@router.post("/avaliacao/")
 async def avaliar_empresa(avaliacao: Avaliacao, current_user: User = Depends(get_current_user)):
-    sentimento = await analisar_sentimento(avaliacao.comentario)
+    resultado = await sentiment_engine.analyze(avaliacao.comentario)
+    sentimento = resultado.label
     avaliacao.sentimento = sentimento
-    await db.avaliacoes.insert_one(avaliacao.dict())
+    documento = {**avaliacao.dict(), "criado_em": datetime.utcnow(), "reputacao_contada": False}
+    await db.avaliacoes.insert_one(documento)
+    # Só marca depois de somar: se `record` falhar, o backfill ainda conta esta avaliação.
+    await company_reputation.record([documento])
+    await db.avaliacoes.update_one({"_id": documento["_id"]}, {"$set": {"reputacao_contada": True}})
     return JSONResponse(content={"detail": "Avaliação registrada com sucesso.", "sentimento": sentimento})
 
-@app.post("/alerta-vagas/")
+@router.post("/avaliacoes/lote", summary="Importar avaliações em lote (lista JSON ou NDJSON)")
+async def avaliar_empresas_lote(request: Request, current_user: User = Depends(get_current_user)):
+    importer = ReviewImporter(db.avaliacoes, sentiment_engine, Avaliacao, on_insert=company_reputation.record)
+    if "ndjson" in request.headers.get("content-type", ""):
+        itens = iter_ndjson(request.stream())
+    else:
+        try:
+            corpo = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Corpo deve ser uma lista JSON ou NDJSON.")
+        if not isinstance(corpo, list):
+            raise HTTPException(status_code=400, detail="Corpo deve ser uma lista JSON ou NDJSON.")
+        if len(corpo) > AVALIACOES_LOTE_MAX:
+            raise HTTPException(status_code=413, detail=f"Máximo de {AVALIACOES_LOTE_MAX} avaliações por requisição.")
+        itens = iter_list(corpo)
+    return await importer.run(itens)
+
+@router.post("/alerta-vagas/")
 async def criar_alerta(alerta: FiltrosPesquisa, current_user: User = Depends(get_current_user)):
-    await db.alertas.insert_one(alerta.dict())
+    # O alerta pertence ao e-mail da conta; é por ele que a listagem filtra.
+    await db.alertas.insert_one({**alerta.dict(), "email": current_user["email"]})
     return JSONResponse(content={"detail": "Alerta de vagas criado com sucesso."})
 
-@app.post("/buscar/vagas", summary="Buscar vagas com filtros")
-async def buscar_vagas(filtros: FiltrosPesquisa):
-    query = f"{' '.join(filtros.palavras_chave)} {filtros.localizacao} {filtros.tipo_trabalho} {filtros.setor}"
-    resultados = await buscar_no_google(query)
-    return {"resultados": resultados}
+@router.get("/alerta-vagas/", summary="Listar alertas de vagas")
+async def listar_alertas(
+    cursor: Optional[str] = None, limite: int = LISTAGEM_LIMITE_PADRAO, current_user: User = Depends(get_current_user),
+):
+    return await paginate(db.alertas, {"email": current_user["email"]}, CAMPOS_ALERTA, cursor, limite)
+
+@router.get("/avaliacoes/", summary="Listar avaliações de empresas")
+async def listar_avaliacoes(
+    empresa: Optional[str] = None, cursor: Optional[str] = None, limite: int = LISTAGEM_LIMITE_PADRAO,
+    current_user: User = Depends(get_current_user),
+):
+    filtro = {"empresa": empresa} if empresa else {}
+    return await paginate(db.avaliacoes, filtro, CAMPOS_AVALIACAO, cursor, limite)
+
+@router.get("/avaliacoes/exportar", summary="Exportar avaliações em NDJSON ou CSV")
+async def exportar_avaliacoes(
+    formato: str = "ndjson", empresa: Optional[str] = None, current_user: User = Depends(get_current_user)
+):
+    filtro = {"empresa": empresa} if empresa else {}
+    return export_response(db.avaliacoes, filtro, list(CAMPOS_AVALIACAO), formato, "avaliacoes")
+
+@router.post("/alerta-vagas/processar", summary="Processar alertas de vagas agora")
+async def processar_alertas(current_user: User = Depends(get_admin_user)):
+    return await job_alert_matcher.run_once()
+
+@router.post("/buscar/vagas", summary="Buscar vagas com filtros")
+async def buscar_vagas(filtros: FiltrosPesquisa, start: int = Query(1, ge=1, le=91)):
+    query = f"{' '.join(normalize_list(filtros.palavras_chave))} {filtros.localizacao} {filtros.tipo_trabalho} {filtros.setor}"
+    return await buscar_no_google(query, start)
 
-@app.put("/avaliar/empresa/{avaliacao_id}", summary="Atualizar avaliação de empresa", response_model=Avaliacao)
+@router.put("/avaliar/empresa/{avaliacao_id}", summary="Atualizar avaliação de empresa")
 async def atualizar_avaliacao(avaliacao_id: str, avaliacao: Avaliacao, current_user: User = Depends(get_current_user)):
-    resultado = await db.avaliacoes.update_one({"_id": avaliacao_id}, {"$set": avaliacao.dict()})
-    if resultado.modified_count == 1:
-        return {"status": "Avaliação atualizada com sucesso!"}
-    else:
+    if avaliacao.sentimento is None:
+        avaliacao.sentimento = (await sentiment_engine.analyze(avaliacao.comentario)).label
+    filtro = {"_id": ObjectId(avaliacao_id) if ObjectId.is_valid(avaliacao_id) else avaliacao_id}
+    antes = await db.avaliacoes.find_one_and_update(filtro, {"$set": avaliacao.dict()})
+    if antes is None:
         raise HTTPException(status_code=404, detail="Avaliação não encontrada.")
+    await company_reputation.replace(antes, {**antes, **avaliacao.dict()})
+    return {"status": "Avaliação atualizada com sucesso!"}
+
+@router.get("/empresas/{empresa}/reputacao", summary="Reputação agregada de uma empresa")
+async def reputacao_empresa(empresa: str, current_user: User = Depends(get_current_user)):
+    reputacao = await company_reputation.get(empresa)
+    if reputacao is None:
+        raise HTTPException(status_code=404, detail="Nenhuma avaliação para esta empresa.")
+    return reputacao
+
+@router.post("/empresas/reputacao/backfill", summary="Contar avaliações antigas nos agregados por empresa")
+async def backfill_reputacao(current_user: User = Depends(get_admin_user)):
+    return await company_reputation.backfill()
+
+@router.get("/sugerir/vagas", summary="Sugestões de vagas personalizadas")
+async def sugerir_vagas(
+    cursor: Optional[str] = None, limite: int = LISTAGEM_LIMITE_PADRAO, current_user: User = Depends(get_current_user),
+):
+    pagina = await paginate(
+        db.sugestoes, {"email": current_user["email"]}, CAMPOS_SUGESTAO, cursor, limite, sort_field="score", descending=True
+    )
+    return {
+        "sugestoes": pagina["itens"],
+        "proximo_cursor": pagina["proximo_cursor"],
+        "ultima_execucao": job_alert_matcher.last_run,
+    }
 
-@app.get("/sugerir/vagas", summary="Sugestões de vagas personalizadas")
-async def sugerir_vagas(usuario_id: str, current_user: User = Depends(get_current_user)):
-    alertas = await db.alertas.find({"email": usuario_id}).to_list(100)
-    return {"alertas": alertas}
+app.include_router(router)
+app.include_router(ops_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,25 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+import jwt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+
+
+def encode_token(data: dict, expires_delta: timedelta, algorithm: str = "HS256") -> str:
+    return jwt.encode({**data, "exp": datetime.utcnow() + expires_delta}, SECRET_KEY, algorithm=algorithm)
+
+
+def decode_token(token: str, algorithm: str = "HS256") -> Optional[dict]:
+    """Payload de um JWT válido, ou None se a assinatura não confere ou o token expirou.
+
+    Usado pelas três APIs (PyJWT); os tokens HS256 emitidos antes com python-jose continuam válidos.
+    """
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[algorithm])
+    except jwt.PyJWTError:
+        return None
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import ClientSession
+
+from whatsapp_inbound import twilio_signature
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga para o webhook de mensagens recebidas (Twilio).")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/whatsapp/webhook/twilio",
+                        help="Padrão: o app único (main:app); com whatsapp_rebornbot_api:app sozinho, /webhook/twilio.")
+    parser.add_argument("--auth-token", default=os.getenv("TWILIO_AUTH_TOKEN", "test"))
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--numbers", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="Fração reenviada com o mesmo MessageSid.")
+    args = parser.parse_args()
+
+    numbers = [f"+55119{index:08d}" for index in range(args.numbers)]
+    payloads = []
+    for index in range(args.messages):
+        params = {
+            "MessageSid": f"SM{uuid.uuid4().hex}",
+            "From": f"whatsapp:{random.choice(numbers)}",
+            "To": "whatsapp:+14155238886",
+            "Body": f"Mensagem de teste {index}",
+            "ProfileName": "Carga",
+        }
+        payloads.append(params)
+        if random.random() < args.duplicate_ratio:
+            payloads.append(dict(params))
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = Counter()
+
+    async with ClientSession() as session:
+        async def post(params):
+            headers = {"X-Twilio-Signature": twilio_signature(args.auth_token, args.url, params)}
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(args.url, data=params, headers=headers) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(post(params) for params in payloads))
+        elapsed = time.perf_counter() - start
+
+    print(f"requisições: {len(payloads)} ({len(payloads) - args.messages} duplicadas) em {elapsed:.2f}s "
+          f"= {len(payloads) / elapsed:.0f} req/s")
+    print(f"ack: p50={statistics.median(latencies) * 1000:.1f}ms  p95={percentile(latencies, 0.95) * 1000:.1f}ms  "
+          f"p99={percentile(latencies, 0.99) * 1000:.1f}ms")
+    print(f"status: {dict(statuses)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_alerts import AlertIndex, CompiledAlert, tokenize
+
+SKILLS = [
+    "python", "java", "javascript", "react", "django", "fastapi", "sql", "aws", "docker", "kubernetes",
+    "go", "rust", "php", "laravel", "angular", "vue", "node", "typescript", "kotlin", "swift",
+    "excel", "power bi", "sap", "salesforce", "figma", "scrum", "marketing digital", "seo", "contabilidade", "rh",
+]
+SKILLS += [f"skill{i}" for i in range(300)]
+CITIES = ["são paulo", "rio de janeiro", "belo horizonte", "curitiba", "recife", "porto alegre", "remoto"]
+TIPOS = ["clt", "pj", "estágio", "freelancer"]
+SETORES = ["tecnologia", "financeiro", "varejo", "saúde", "educação", "indústria"]
+
+
+def synthetic_alerts(count: int, rng: random.Random):
+    return [
+        {
+            "_id": i,
+            "email": f"user{i % (count // 3 + 1)}@example.com",
+            "palavras_chave": rng.sample(SKILLS, rng.randint(1, 3)),
+            "localizacao": rng.choice(CITIES),
+            "tipo_trabalho": rng.choice(TIPOS),
+            "setor": rng.choice(SETORES),
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_postings(count: int, rng: random.Random):
+    postings = []
+    for i in range(count):
+        skills = rng.sample(SKILLS, rng.randint(2, 5))
+        postings.append({
+            "titulo": f"Desenvolvedor {skills[0]} ({rng.choice(TIPOS)})",
+            "resumo": f"Vaga em {rng.choice(CITIES)} no setor {rng.choice(SETORES)}. Requisitos: {', '.join(skills)}.",
+            "link": f"https://vagas.example.com/{i}",
+        })
+    return postings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Casamento de alertas: índice invertido vs. varredura por alerta.")
+    parser.add_argument("--alerts", type=int, default=20000)
+    parser.add_argument("--postings", type=int, default=2000)
+    parser.add_argument("--naive-postings", type=int, default=100, help="amostra usada na varredura ingênua")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    alerts = synthetic_alerts(args.alerts, rng)
+    postings = synthetic_postings(args.postings, rng)
+
+    start = time.perf_counter()
+    index = AlertIndex(alerts)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    suggestions = index.match_all(postings)
+    elapsed = time.perf_counter() - start
+    total = sum(len(by_link) for by_link in suggestions.values())
+    print(f"índice: build={build * 1000:.0f}ms  match={elapsed * 1000:.0f}ms  "
+          f"{args.postings / elapsed:,.0f} vagas/s  sugestões={total}")
+
+    compiled = [CompiledAlert(alert) for alert in alerts]
+    sample = postings[:args.naive_postings]
+    start = time.perf_counter()
+    for posting in sample:
+        tokens = tokenize(f"{posting['titulo']} {posting['resumo']}")
+        for alert in compiled:
+            alert.score(tokens)
+    naive = time.perf_counter() - start
+    print(f"ingênuo: {len(sample) / naive:,.0f} vagas/s  (speedup {(args.postings / elapsed) / (len(sample) / naive):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+
+from metrics import HTTP_DURATION, MetricsMiddleware, metrics, track
+
+
+class MiddlewareVazio:
+    """Camada ASGI que não faz nada: separa o custo de uma camada a mais do custo das métricas."""
+
+    def __init__(self, app, app_name: str):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+
+
+def criar_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+    instrumentado = middleware is MetricsMiddleware
+    if middleware is not None:
+        app.add_middleware(middleware, app_name="bench")
+
+    @app.get("/users/me")
+    async def users_me():
+        return {"username": "ana", "email": "ana@example.com", "name": "Ana"}
+
+    @app.get("/curriculo/{nome}/")
+    async def curriculo(nome: str):
+        if instrumentado:
+            with track("mongodb", "find"):
+                pass
+        return {"nome": nome}
+
+    return app
+
+
+async def rodada(client: httpx.AsyncClient, requests: int) -> float:
+    start = time.perf_counter()
+    for index in range(requests):
+        if index % 2:
+            await client.get("/users/me")
+        else:
+            await client.get(f"/curriculo/pessoa{index % 50}/")
+    return (time.perf_counter() - start) / requests
+
+
+def micro(nome: str, fn, iteracoes: int):
+    start = time.perf_counter()
+    for _ in range(iteracoes):
+        fn()
+    print(f"{nome:>28}: {(time.perf_counter() - start) / iteracoes * 1e9:8.0f} ns")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Custo por requisição do middleware de métricas e do track().")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    clientes = {
+        nome: httpx.AsyncClient(transport=httpx.ASGITransport(app=criar_app(middleware)), base_url="http://bench")
+        for nome, middleware in (("sem métricas", None), ("middleware vazio", MiddlewareVazio), ("com métricas", MetricsMiddleware))
+    }
+    melhores = {nome: float("inf") for nome in clientes}
+    # Rodadas intercaladas; fica o melhor tempo de cada lado para descontar ruído da máquina.
+    for _ in range(args.rounds):
+        for nome, client in clientes.items():
+            melhores[nome] = min(melhores[nome], await rodada(client, args.requests))
+    for client in clientes.values():
+        await client.aclose()
+
+    for nome, segundos in melhores.items():
+        print(f"{nome:>28}: {segundos * 1e6:8.1f} µs/req")
+    extra = melhores["com métricas"] - melhores["sem métricas"]
+    print(f"{'overhead total':>28}: {extra * 1e6:8.1f} µs/req ({extra / melhores['sem métricas'] * 100:+.1f}%)")
+    extra = melhores["com métricas"] - melhores["middleware vazio"]
+    print(f"{'só as métricas':>28}: {extra * 1e6:8.1f} µs/req")
+
+    micro("Histogram.observe", lambda: HTTP_DURATION.observe(0.012, "bench", "GET", "/users/me"), 200000)
+
+    def com_track():
+        with track("openai", "chat_completion"):
+            pass
+
+    micro("track()", com_track, 200000)
+    start = time.perf_counter()
+    corpo = metrics.render()
+    print(f"{'render /metrics':>28}: {(time.perf_counter() - start) * 1000:8.2f} ms ({len(corpo)} bytes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
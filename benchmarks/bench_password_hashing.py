@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_hashing import PasswordHasher
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    max_lag = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - start - interval)
+    return max_lag
+
+
+async def run(label: str, login, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await login()
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(heartbeat(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    max_lag = await lag_task
+    print(f"{label:>8}: {logins / elapsed:8.1f} logins/s  total={elapsed:6.2f}s  max_loop_lag={max_lag * 1000:7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Throughput de login com bcrypt no loop vs. no pool.")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(rounds=args.rounds, workers=args.workers)
+    hashed = await hasher.hash("senha-de-teste")
+
+    async def inline_login():
+        hasher.context.verify("senha-de-teste", hashed)
+
+    async def pooled_login():
+        await hasher.verify("senha-de-teste", hashed)
+
+    print(f"rounds={args.rounds} workers={args.workers} concurrency={args.concurrency}")
+    await run("inline", inline_login, args.logins, args.concurrency)
+    await run("pool", pooled_login, args.logins, args.concurrency)
+    hasher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_renderer import PdfRenderer
+
+DADOS = {
+    "nome": "Maria Silva",
+    "local": "São Paulo",
+    "telefone": "N/A",
+    "email": "maria@example.com",
+    "experiencia": "\n".join(f"Empresa {i} – Desenvolvedora Python (20{10 + i}–20{11 + i})" for i in range(4)),
+    "habilidades": "Python, FastAPI, MongoDB, Docker, AWS",
+    "educacao": "Educação não fornecida.",
+    "projetos": "Projetos não fornecidos.",
+}
+
+
+async def run(workers: int, documents: int, concurrency: int):
+    renderer = PdfRenderer(workers=workers)
+    renderer.start()
+    await renderer.render(DADOS)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await renderer.render(DADOS)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(documents)))
+    elapsed = time.perf_counter() - start
+    stats = renderer.stats()
+    renderer.close()
+    label = "thread" if workers == 0 else f"{workers} processo(s)"
+    print(f"{label:>14}: {documents / elapsed:8.1f} currículos/s  "
+          f"render médio={stats['avg_render_seconds'] * 1000:6.2f}ms  overhead médio={stats['avg_overhead_seconds'] * 1000:7.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Currículos por segundo para diferentes tamanhos de pool.")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool-sizes", default="0,1,2,4")
+    args = parser.parse_args()
+    for workers in (int(value) for value in args.pool_sizes.split(",")):
+        await run(workers, args.documents, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mongomock_motor import AsyncMongoMockClient
+from pydantic import BaseModel
+
+from review_batch import ReviewImporter, iter_list
+from sentiment import LABELS, SentimentEngine
+
+
+class Avaliacao(BaseModel):
+    comentario: str
+    empresa: str
+    usuario_id: str
+    sentimento: Optional[str] = None
+
+
+def fake_llm(latency: float, per_item: float):
+    """Pontuador simulado: custo fixo por chamada mais um custo por texto do prompt."""
+
+    async def single(texto: str) -> str:
+        await asyncio.sleep(latency + per_item)
+        return random.choice(LABELS)
+
+    async def batch(textos: List[str]) -> str:
+        await asyncio.sleep(latency + per_item * len(textos))
+        return "\n".join(f"{index}: {random.choice(LABELS)}" for index in range(1, len(textos) + 1))
+
+    return single, batch
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Avaliações/s: uma por requisição vs. importação em lote.")
+    parser.add_argument("--reviews", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.2, help="Custo fixo de cada chamada ao LLM (s).")
+    parser.add_argument("--per-item", type=float, default=0.005, help="Custo por texto no prompt (s).")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    single, batch = fake_llm(args.latency, args.per_item)
+    itens = [
+        {"comentario": f"Avaliação {index} sobre a empresa", "empresa": f"Empresa {index % 25}", "usuario_id": f"u{index}"}
+        for index in range(args.reviews)
+    ]
+
+    db = AsyncMongoMockClient()["bench"]
+    engine = SentimentEngine(llm_fallback=single, model_path=None)
+    start = time.perf_counter()
+    for item in itens:
+        avaliacao = Avaliacao(**item)
+        avaliacao.sentimento = (await engine.analyze(avaliacao.comentario)).label
+        await db.sequencial.insert_one(avaliacao.dict())
+    sequencial = time.perf_counter() - start
+    print(f"{'sequencial':>10}: {args.reviews / sequencial:8.1f} avaliações/s  ({engine.fallback_calls} chamadas ao LLM)")
+
+    engine = SentimentEngine(
+        llm_fallback=single, llm_batch_fallback=batch, model_path=None,
+        batch_size=args.batch_size, max_concurrency=args.concurrency,
+    )
+    importer = ReviewImporter(db.lote, engine, Avaliacao)
+    start = time.perf_counter()
+    resultado = await importer.run(iter_list(itens))
+    lote = time.perf_counter() - start
+    print(f"{'lote':>10}: {resultado['inseridas'] / lote:8.1f} avaliações/s  "
+          f"({engine.batch_calls} chamadas em lote, {engine.fallback_calls} individuais)")
+    print(f"ganho: {sequencial / lote:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
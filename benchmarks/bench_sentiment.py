@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sentiment import LocalSentimentModel, SentimentEngine, load_dataset
+
+
+def report(label: str, latencies, elapsed: float, count: int):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label:>22}: {count / elapsed:10.1f} msgs/s  p50={p50:8.2f}ms  p95={p95:8.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Sentimento via LLM (mock) vs. modelo local em lote.")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="latência simulada do LLM em segundos")
+    parser.add_argument("--llm-concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    texts, labels = load_dataset(os.path.join(ROOT, "data", "sentimento_seed.csv"))
+    model = LocalSentimentModel.train(texts, labels)
+    messages = [random.choice(texts) for _ in range(args.messages)]
+    semaphore = asyncio.Semaphore(args.llm_concurrency)
+
+    async def mocked_llm(message: str) -> str:
+        async with semaphore:
+            await asyncio.sleep(args.llm_latency)
+        return "O sentimento é neutro."
+
+    async def timed(coro, latencies):
+        start = time.perf_counter()
+        await coro
+        latencies.append(time.perf_counter() - start)
+
+    llm_only = SentimentEngine(llm_fallback=mocked_llm, model_path=None)
+    llm_only._model_loaded = True
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(llm_only.analyze(message), latencies) for message in messages))
+    report("llm (mock)", latencies, time.perf_counter() - start, len(messages))
+
+    local = SentimentEngine(model=model, use_fallback=False)
+    latencies = []
+    start = time.perf_counter()
+    for message in messages:
+        await timed(local.analyze(message), latencies)
+    report("local, 1 por chamada", latencies, time.perf_counter() - start, len(messages))
+
+    latencies = []
+    start = time.perf_counter()
+    for offset in range(0, len(messages), args.batch_size):
+        batch = messages[offset:offset + args.batch_size]
+        await timed(local.analyze_batch(batch), latencies)
+    report(f"local, lote de {args.batch_size}", latencies, time.perf_counter() - start, len(messages))
+
+    hybrid = SentimentEngine(llm_fallback=mocked_llm, model=model)
+    latencies = []
+    start = time.perf_counter()
+    for offset in range(0, len(messages), args.batch_size):
+        await timed(hybrid.analyze_batch(messages[offset:offset + args.batch_size]), latencies)
+    report("local + fallback LLM", latencies, time.perf_counter() - start, len(messages))
+    print(f"fallbacks para o LLM: {hybrid.fallback_calls}/{len(messages)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependências que só devem ser importadas no primeiro uso (PDF, hash de senha, SMTP, modelo de sentimento).
+PESADOS = ("reportlab", "passlib", "aiosmtplib", "jose", "uvicorn", "joblib", "sklearn", "openai", "twilio")
+
+LINHA_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Roda num processo novo: importa o app, sobe o lifespan com mongomock e mede cada etapa. O import do
+# mongomock fica fora da conta; o cliente precisa ser trocado antes do app, que pega o `db` no import.
+SCRIPT_STARTUP = """
+import json, os, resource, sys, time
+inicio = time.perf_counter()
+from database import database
+mock = time.perf_counter()
+from mongomock_motor import AsyncMongoMockClient
+database.client = AsyncMongoMockClient()
+import asyncio, contextlib
+start = inicio + time.perf_counter() - mock
+import {modulo} as alvo
+importado = time.perf_counter()
+
+async def subir():
+    with contextlib.redirect_stdout(sys.stderr):
+        async with alvo.app.router.lifespan_context(alvo.app):
+            return time.perf_counter()
+
+pronto = asyncio.run(subir())
+print(json.dumps({{
+    "import_ms": (importado - start) * 1000,
+    "startup_ms": (pronto - importado) * 1000,
+    "total_ms": (pronto - start) * 1000,
+    "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "carregados": sorted(nome for nome in {pesados!r} if nome in sys.modules),
+}}))
+"""
+
+
+def ambiente() -> dict:
+    env = dict(os.environ)
+    env.setdefault("SMTP_PORT", "465")
+    env.setdefault("DATABASE_NAME", "bench_startup")
+    env.setdefault("JOB_ALERT_INTERVAL", "0")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def importtime(modulo: str) -> dict:
+    """`python -X importtime -c "import <modulo>"`: tempo cumulativo e o tempo próprio por pacote."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"], cwd=ROOT, env=ambiente(),
+                          capture_output=True, text=True, check=True)
+    total_us = 0
+    pacotes = {}
+    for linha in proc.stderr.splitlines():
+        encontrado = LINHA_IMPORTTIME.match(linha)
+        if not encontrado:
+            continue
+        proprio, cumulativo, recuo, nome = encontrado.groups()
+        if recuo == " ":
+            total_us += int(cumulativo)
+        # Tempo próprio somado por pacote raiz: mostra quem pesa de fato (fastapi, aiohttp...), não só `main`.
+        raiz = nome.split(".")[0]
+        pacotes[raiz] = pacotes.get(raiz, 0) + int(proprio)
+    mais_caros = sorted(pacotes.items(), key=lambda item: item[1], reverse=True)[:15]
+    return {"total_ms": total_us / 1000, "top": {nome: round(us / 1000, 1) for nome, us in mais_caros}}
+
+
+def startup(modulo: str) -> dict:
+    proc = subprocess.run([sys.executable, "-c", SCRIPT_STARTUP.format(modulo=modulo, pesados=PESADOS)], cwd=ROOT,
+                          env=ambiente(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de import e de startup do app, com orçamento.")
+    parser.add_argument("--module", default="main", help="Módulo com o `app` (padrão: o app único).")
+    parser.add_argument("--runs", type=int, default=5, help="Processos novos por medição; vale a mediana.")
+    parser.add_argument("--budget-import-ms", type=float, default=1500.0)
+    parser.add_argument("--budget-startup-ms", type=float, default=500.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    execucoes = [startup(args.module) for _ in range(args.runs)]
+    tempos = importtime(args.module)
+    resultado = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_ms": round(statistics.median(e["import_ms"] for e in execucoes), 1),
+        "startup_ms": round(statistics.median(e["startup_ms"] for e in execucoes), 1),
+        "total_ms": round(statistics.median(e["total_ms"] for e in execucoes), 1),
+        "maxrss_mb": round(max(e["maxrss_mb"] for e in execucoes), 1),
+        "importtime": tempos,
+        "pesados_no_startup": execucoes[-1]["carregados"],
+        "budget": {"import_ms": args.budget_import_ms, "startup_ms": args.budget_startup_ms},
+    }
+    estouros = []
+    if resultado["import_ms"] > args.budget_import_ms:
+        estouros.append(f"import {resultado['import_ms']}ms > {args.budget_import_ms}ms")
+    if resultado["startup_ms"] > args.budget_startup_ms:
+        estouros.append(f"startup {resultado['startup_ms']}ms > {args.budget_startup_ms}ms")
+    if resultado["pesados_no_startup"]:
+        estouros.append("importados no startup: " + ", ".join(resultado["pesados_no_startup"]))
+    resultado["ok"] = not estouros
+
+    texto = json.dumps(resultado, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(texto + "\n")
+    print(texto)
+    for estouro in estouros:
+        print(f"fora do orçamento: {estouro}", file=sys.stderr)
+    sys.exit(1 if estouros else 0)
+
+
+if __name__ == "__main__":
+    main()
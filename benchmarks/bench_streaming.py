@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from fakes import fake_openai_app, start_server
+
+SENHA = "senha-de-bench"
+
+
+async def servir(app):
+    """Sobe o app com uvicorn numa porta livre: o ASGITransport do httpx só devolve a resposta inteira."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task, f"http://127.0.0.1:{server.servers[0].sockets[0].getsockname()[1]}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description="Tempo até o primeiro byte em POST /mensagem-recrutador/: resposta inteira vs. SSE (?stream=true)."
+    )
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tokens", type=int, default=60)
+    args = parser.parse_args()
+
+    runner, base_url = await start_server(fake_openai_app(args.latency, args.token_delay, args.tokens))
+    # As constantes dos módulos são lidas no import; o cliente do Mongo precisa ser trocado antes do app.
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_API_URL": f"{base_url}/v1/chat/completions",
+        "SECRET_KEY": "bench-streaming-secret-key-with-32-bytes",
+        "DATABASE_NAME": "bench_streaming",
+        "JOB_ALERT_INTERVAL": "0",
+        "BCRYPT_ROUNDS": "4",
+    })
+    os.environ.setdefault("SMTP_PORT", "465")
+    from mongomock_motor import AsyncMongoMockClient
+
+    from database import database
+
+    database.client = AsyncMongoMockClient()
+    with redirect_stdout(sys.stderr):
+        import api_recrutmento_linkedin
+
+        server, task, url = await servir(api_recrutmento_linkedin.app)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        usuario = f"bench{uuid.uuid4().hex[:8]}"
+        await client.post("/register/", json={"username": usuario, "email": f"{usuario}@example.com", "password": SENHA})
+        token = (await client.post("/token/", data={"username": usuario, "password": SENHA})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def corpo():
+            # Habilidade única por requisição: sem isso a segunda chamada em diante sairia do cache de geração.
+            return {"nome": "Ana", "area": "Dados", "habilidades": ["Python", f"h{uuid.uuid4().hex}"]}
+
+        async def completa():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/mensagem-recrutador/", json=corpo(), headers=headers)
+                response.raise_for_status()
+                elapsed = time.perf_counter() - start
+                return elapsed, elapsed
+
+        async def sse():
+            async with semaphore:
+                start = time.perf_counter()
+                first = None
+                async with client.stream("POST", "/mensagem-recrutador/", params={"stream": "true"}, json=corpo(),
+                                         headers=headers) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line.startswith("event: error"):
+                            raise RuntimeError("evento de erro no stream")
+                        if first is None and line.startswith("data:"):
+                            first = time.perf_counter() - start
+                return first, time.perf_counter() - start
+
+        for label, func in (("completion", completa), ("sse", sse)):
+            results = await asyncio.gather(*(func() for _ in range(args.requests)))
+            ttfb = [result[0] for result in results]
+            total = [result[1] for result in results]
+            print(f"{label:>10}: ttfb p50={statistics.median(ttfb) * 1000:7.1f}ms  "
+                  f"total p50={statistics.median(total) * 1000:7.1f}ms")
+
+    server.should_exit = True
+    with redirect_stdout(sys.stderr):
+        await task
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
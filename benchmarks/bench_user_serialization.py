@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, EmailStr, TypeAdapter
+
+from json_response import ORJSONResponse
+
+# Mesmos campos de USER_PROJECTION / UserPublic em whatsapp_rebornbot_api.py.
+PROJECAO = ("username", "email", "name", "whatsapp_number", "is_active")
+
+
+class UserPublic(BaseModel):
+    username: str
+    email: EmailStr
+    name: str
+    whatsapp_number: Optional[str] = None
+    is_active: bool = False
+
+
+def usuario_completo() -> dict:
+    """Documento de usuário como está gravado no Mongo (perfil, hash da senha, código de ativação)."""
+    return {
+        "_id": ObjectId(),
+        "id": None,
+        "location": "São Paulo, SP",
+        "username": "maria.silva",
+        "email": "maria.silva@example.com",
+        "name": "Maria Silva",
+        "jobtitle": "Engenheira de Software",
+        "role": "Backend",
+        "posts": "42",
+        "coverImg": "https://cdn.example.com/covers/" + "a" * 64 + ".png",
+        "followers": "1532",
+        "description": "Desenvolvedora Python com foco em APIs assíncronas e dados. " * 6,
+        "whatsapp_number": "+5511987654321",
+        "activation_code": None,
+        "is_active": True,
+        "password": "$argon2id$v=19$m=65536,t=3,p=4$" + "x" * 22 + "$" + "y" * 43,
+        "criado_em": datetime(2024, 5, 1, 12, 30),
+    }
+
+
+def medir(nome: str, fn, iteracoes: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(iteracoes):
+        body = fn()
+    elapsed = (time.perf_counter() - start) / iteracoes
+    print(f"{nome:>28}: {elapsed * 1e6:7.2f} µs/req  {len(body):5d} bytes")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo de serialização e tamanho de /users/me: antes vs. depois.")
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    completo = usuario_completo()
+    projetado = {campo: completo[campo] for campo in PROJECAO}
+    adapter = TypeAdapter(UserPublic)
+    print(f"BSON lido do Mongo: {len(bson.encode(completo))} bytes completo, "
+          f"{len(bson.encode(projetado))} bytes com projeção")
+
+    antes = medir(
+        "antes (jsonable_encoder)",
+        lambda: JSONResponse(jsonable_encoder(completo, custom_encoder={ObjectId: str})).body,
+        args.iterations,
+    )
+    medir(
+        "response_model + orjson",
+        lambda: ORJSONResponse(adapter.dump_python(adapter.validate_python(projetado), mode="json")).body,
+        args.iterations,
+    )
+    depois = medir("depois (ORJSONResponse)", lambda: ORJSONResponse(projetado).body, args.iterations)
+    print(f"ganho: {antes / depois:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import json
+import uuid
+from collections import Counter
+from typing import Optional
+
+from aiohttp import web
+
+
+def fake_openai_app(latency: float = 0.2, token_delay: float = 0.02, tokens: int = 40, rate_limit_every: int = 0,
+                    stats: Optional[Counter] = None) -> web.Application:
+    """Servidor local compatível com /v1/chat/completions (com e sem `stream`).
+
+    `latency` é o tempo até o primeiro token, `token_delay` o intervalo entre tokens e, se
+    `rate_limit_every` > 0, uma a cada N requisições recebe 429 com Retry-After.
+    """
+    counter = itertools.count(1)
+    stats = stats if stats is not None else Counter()
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        stats["requests"] += 1
+        if rate_limit_every and next(counter) % rate_limit_every == 0:
+            stats["rate_limited"] += 1
+            return web.json_response({"error": {"message": "Rate limit"}}, status=429, headers={"Retry-After": "0.05"})
+        words = [f"palavra{i}." if (i + 1) % 12 == 0 or i == tokens - 1 else f"palavra{i}" for i in range(tokens)]
+        await asyncio.sleep(latency)
+        if not body.get("stream"):
+            await asyncio.sleep(token_delay * tokens)
+            content = " ".join(words)
+            return web.json_response({"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for index, word in enumerate(words):
+            text = word if index == len(words) - 1 else word + " "
+            chunk = {"choices": [{"index": 0, "delta": {"content": text}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(token_delay)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    return app
+
+
+def fake_twilio_app(latency: float = 0.05, rate_limit_every: int = 0, stats: Optional[Counter] = None) -> web.Application:
+    """Endpoint de envio de mensagens da Twilio (`/2010-04-01/Accounts/{sid}/Messages.json`)."""
+    counter = itertools.count(1)
+    stats = stats if stats is not None else Counter()
+
+    async def messages(request: web.Request) -> web.Response:
+        form = await request.post()
+        await asyncio.sleep(latency)
+        if rate_limit_every and next(counter) % rate_limit_every == 0:
+            stats["rate_limited"] += 1
+            return web.json_response({"code": 20429, "message": "Too Many Requests"}, status=429, headers={"Retry-After": "0.05"})
+        stats["messages"] += 1
+        return web.json_response(
+            {"sid": f"SM{uuid.uuid4().hex}", "status": "queued", "to": form.get("To"), "body": form.get("Body")},
+            status=201,
+        )
+
+    app = web.Application()
+    app.router.add_post("/2010-04-01/Accounts/{account_sid}/Messages.json", messages)
+    return app
+
+
+def fake_google_app(latency: float = 0.1, error_every: int = 0, stats: Optional[Counter] = None) -> web.Application:
+    """Google Custom Search (`/customsearch/v1`) com 10 vagas por página.
+
+    Se `error_every` > 0, uma a cada N buscas recebe um 502 em HTML, como o de um proxy.
+    """
+    counter = itertools.count(1)
+    stats = stats if stats is not None else Counter()
+
+    async def search(request: web.Request) -> web.Response:
+        query = request.query.get("q", "")
+        start = int(request.query.get("start", 1))
+        await asyncio.sleep(latency)
+        if error_every and next(counter) % error_every == 0:
+            stats["errors"] += 1
+            return web.Response(text="<html><body>502 Bad Gateway</body></html>", status=502, content_type="text/html")
+        stats["searches"] += 1
+        items = [
+            {
+                "title": f"Vaga {start + index}: {query}",
+                "link": f"https://vagas.example.com/{uuid.uuid5(uuid.NAMESPACE_URL, f'{query}/{start + index}').hex}",
+                "snippet": f"Oportunidade para {query}.",
+                "displayLink": "vagas.example.com",
+            }
+            for index in range(10)
+        ]
+        return web.json_response({
+            "items": items,
+            "searchInformation": {"totalResults": "100"},
+            "queries": {"nextPage": [{"startIndex": start + 10}]} if start + 10 <= 91 else {},
+        })
+
+    app = web.Application()
+    app.router.add_get("/customsearch/v1", search)
+    return app
+
+
+class SMTPSink:
+    """Handler do aiosmtpd que aceita e só conta as mensagens."""
+
+    def __init__(self):
+        self.messages = 0
+        self.recipients = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        self.recipients += len(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+async def start_smtp_sink(host: str = "127.0.0.1", port: int = 0):
+    """Inicia um servidor SMTP (aiosmtpd) no loop atual e retorna (server, sink, porta)."""
+    from aiosmtpd.smtp import SMTP
+
+    sink = SMTPSink()
+    server = await asyncio.get_running_loop().create_server(lambda: SMTP(sink, hostname="localhost"), host, port)
+    return server, sink, server.sockets[0].getsockname()[1]
+
+
+async def start_server(app: web.Application, host: str = "127.0.0.1", port: int = 0):
+    """Inicia `app` e retorna (runner, url_base)."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    sockets = site._server.sockets
+    return runner, f"http://{host}:{sockets[0].getsockname()[1]}"
@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack, redirect_stdout
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+import httpx
+
+from fakes import fake_google_app, fake_openai_app, fake_twilio_app, start_server, start_smtp_sink
+
+APPS = {
+    "recrutamento": "api_recrutmento_linkedin",
+    "curriculos": "api_gerador_curriculos",
+    "whatsapp": "whatsapp_rebornbot_api",
+}
+SENHA = "senha-de-carga"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def resumo(latencias: List[float], erros: int, elapsed: float) -> dict:
+    if not latencias:
+        return {"requests": 0, "errors": erros}
+    return {
+        "requests": len(latencias),
+        "errors": erros,
+        "rps": round(len(latencias) / elapsed, 2),
+        "mean_ms": round(sum(latencias) / len(latencias) * 1000, 3),
+        "p50_ms": round(percentile(latencias, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencias, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencias, 0.99) * 1000, 3),
+        "max_ms": round(max(latencias) * 1000, 3),
+    }
+
+
+class Recorder:
+    """Latência e status por operação (nome lógico, não a URL concreta)."""
+
+    def __init__(self):
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Counter] = defaultdict(Counter)
+
+    async def request(self, client: httpx.AsyncClient, nome: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = str(response.status_code)
+        except Exception as e:
+            response, status = None, type(e).__name__
+        self.latencias[nome].append(time.perf_counter() - start)
+        self.status[nome][status] += 1
+        return response
+
+    def relatorio(self, elapsed: float) -> dict:
+        endpoints = {}
+        todas: List[float] = []
+        erros_total = 0
+        for nome, latencias in self.latencias.items():
+            erros = sum(n for status, n in self.status[nome].items() if not status.isdigit() or int(status) >= 400)
+            endpoints[nome] = {**resumo(latencias, erros, elapsed), "status": dict(self.status[nome])}
+            todas.extend(latencias)
+            erros_total += erros
+        return {**resumo(todas, erros_total, elapsed), "duration_s": round(elapsed, 3), "endpoints": endpoints}
+
+
+# Cada cenário: login(client, rec, usuario) -> headers, e operações (nome, peso, fn(client, rec, usuario, headers, rng)).
+Operacao = Tuple[str, int, Callable[..., Awaitable]]
+
+
+async def login_recrutamento(client, rec, usuario):
+    await rec.request(client, "POST /register/", "POST", "/register/", json={
+        "username": usuario["id"], "email": f"{usuario['id']}@example.com", "full_name": usuario["nome"], "password": SENHA,
+    })
+    response = await rec.request(client, "POST /token/", "POST", "/token/", data={"username": usuario["id"], "password": SENHA})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+OPERACOES_RECRUTAMENTO: List[Operacao] = [
+    ("GET /users/me/", 4, lambda c, rec, u, h, rng: rec.request(c, "GET /users/me/", "GET", "/users/me/", headers=h)),
+    ("POST /mensagem-recrutador/", 2, lambda c, rec, u, h, rng: rec.request(
+        c, "POST /mensagem-recrutador/", "POST", "/mensagem-recrutador/", headers=h,
+        json={"nome": u["nome"], "area": "Dados", "habilidades": ["Python", f"Habilidade {rng.randint(0, 200)}"]})),
+    ("POST /avaliacao/", 2, lambda c, rec, u, h, rng: rec.request(
+        c, "POST /avaliacao/", "POST", "/avaliacao/", headers=h,
+        json={"comentario": "Ótimo ambiente e bons benefícios.", "empresa": f"Empresa {rng.randint(0, 20)}", "usuario_id": u["id"]})),
+    ("GET /avaliacoes/", 2, lambda c, rec, u, h, rng: rec.request(
+        c, "GET /avaliacoes/", "GET", "/avaliacoes/", headers=h, params={"limite": 20})),
+    ("POST /buscar/vagas", 1, lambda c, rec, u, h, rng: rec.request(
+        c, "POST /buscar/vagas", "POST", "/buscar/vagas", headers=h,
+        json={"palavras_chave": ["python", f"area{rng.randint(0, 30)}"], "localizacao": "Remoto", "tipo_trabalho": "remoto",
+              "setor": "tecnologia", "email": f"{u['id']}@example.com"})),
+    ("POST /alerta-vagas/", 1, lambda c, rec, u, h, rng: rec.request(
+        c, "POST /alerta-vagas/", "POST", "/alerta-vagas/", headers=h,
+        json={"palavras_chave": ["python"], "localizacao": "Remoto", "tipo_trabalho": "remoto", "setor": "tecnologia",
+              "email": f"{u['id']}@example.com"})),
+]
+
+
+async def login_curriculos(client, rec, usuario):
+    corpo = {"name": usuario["nome"], "email": f"{usuario['id']}@example.com", "jobtitle": "Engenheira de Dados",
+             "location": "Recife", "password": SENHA}
+    await rec.request(client, "POST /register/", "POST", "/register/", json=corpo)
+    response = await rec.request(client, "POST /token/", "POST", "/token/", json=corpo)
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+OPERACOES_CURRICULOS: List[Operacao] = [
+    ("GET /users/me/", 4, lambda c, rec, u, h, rng: rec.request(c, "GET /users/me/", "GET", "/users/me/", headers=h)),
+    ("POST /curriculo/generate/", 1, lambda c, rec, u, h, rng: rec.request(
+        c, "POST /curriculo/generate/", "POST", "/curriculo/generate/", headers=h,
+        json={"name": f"{u['nome']} {rng.randint(0, 3)}", "email": f"{u['id']}@example.com",
+              "jobtitle": "Engenheira de Dados", "location": "Recife", "password": SENHA})),
+    ("GET /curriculos/", 2, lambda c, rec, u, h, rng: rec.request(
+        c, "GET /curriculos/", "GET", "/curriculos/", headers=h, params={"limite": 20})),
+]
+
+
+async def login_whatsapp(client, rec, usuario):
+    await rec.request(client, "POST /register", "POST", "/register", json={
+        "username": usuario["id"], "email": f"{usuario['id']}@example.com", "name": usuario["nome"],
+        "whatsapp_number": usuario["numero"], "password": SENHA,
+    })
+    response = await rec.request(client, "POST /token", "POST", "/token", data={"username": usuario["id"], "password": SENHA})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def webhook(c, rec, u, h, rng):
+    from whatsapp_inbound import twilio_signature
+
+    url = "http://testserver/webhook/twilio"
+    params = {"MessageSid": f"SM{uuid.uuid4().hex}", "From": f"whatsapp:{u['numero']}", "To": "whatsapp:+14155238886",
+              "Body": "Oi, tudo bem? Quero saber das vagas.", "ProfileName": u["nome"]}
+    headers = {"X-Twilio-Signature": twilio_signature(os.environ["TWILIO_AUTH_TOKEN"], url, params)}
+    return rec.request(c, "POST /webhook/twilio", "POST", url, data=params, headers=headers)
+
+
+OPERACOES_WHATSAPP: List[Operacao] = [
+    ("GET /users/me", 4, lambda c, rec, u, h, rng: rec.request(c, "GET /users/me", "GET", "/users/me", headers=h)),
+    ("POST /send-message/", 2, lambda c, rec, u, h, rng: rec.request(
+        c, "POST /send-message/", "POST", "/send-message/", headers=h,
+        params={"to_number": u["numero"], "message": "Olá! Gostaria de remarcar a entrevista."})),
+    ("POST /webhook/twilio", 2, webhook),
+]
+
+CENARIOS = {
+    "recrutamento": (login_recrutamento, OPERACOES_RECRUTAMENTO),
+    "curriculos": (login_curriculos, OPERACOES_CURRICULOS),
+    "whatsapp": (login_whatsapp, OPERACOES_WHATSAPP),
+}
+
+
+async def executar(nome: str, app, requests: int, concurrency: int, seed: int, run_id: str) -> dict:
+    """`concurrency` usuários virtuais: cada um registra, faz login e segue a mistura até somar `requests`."""
+    login, operacoes = CENARIOS[nome]
+    pesos = [peso for _, peso, _ in operacoes]
+    rec = Recorder()
+    restantes = [requests]
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    async def usuario_virtual(indice: int):
+        rng = random.Random(seed * 1000 + indice)
+        usuario = {"id": f"carga{run_id}{nome[:3]}{indice}", "nome": f"Usuária Carga {indice}", "numero": f"+55119{indice:08d}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+            try:
+                headers = await login(client, rec, usuario)
+            except (KeyError, ValueError, AttributeError):
+                return
+            while restantes[0] > 0:
+                restantes[0] -= 1
+                _, _, fn = rng.choices(operacoes, weights=pesos)[0]
+                await fn(client, rec, usuario, headers, rng)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(usuario_virtual(indice) for indice in range(concurrency)))
+    return rec.relatorio(time.perf_counter() - start)
+
+
+def configurar_ambiente(args, openai_url: str, twilio_url: str, google_url: str, smtp_port: int):
+    # Precisa rodar antes de importar os apps: as constantes são lidas no import.
+    os.environ.update({
+        "OPENAI_API_KEY": "carga",
+        "OPENAI_API_URL": f"{openai_url}/v1/chat/completions",
+        "TWILIO_API_BASE": twilio_url,
+        "GOOGLE_SEARCH_URL": f"{google_url}/customsearch/v1",
+        "GOOGLE_API_KEY": "carga",
+        "GOOGLE_CX": "carga",
+        # Sem o matcher periódico: com --mongo-uri, alertas já gravados disparariam buscas no startup.
+        "JOB_ALERT_INTERVAL": "0",
+        "TWILIO_ACCOUNT_SID": "ACcarga",
+        "TWILIO_AUTH_TOKEN": "carga",
+        "TWILIO_WHATSAPP_NUMBER": "+14155238886",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USE_TLS": "false",
+        "SMTP_MAIL": "carga@example.com",
+        "SMTP_PASSWORD": "",
+        "SECRET_KEY": "carga-secret",
+        "ALGORITHM": "HS256",
+        "DATABASE_NAME": args.database,
+        "WHATSAPP_DATABASE_NAME": f"{args.database}_whatsapp",
+    })
+    if args.bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+
+
+def commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncomparação com {baseline_path} (commit {baseline.get('commit')}):", file=sys.stderr)
+    for app, resultado in atual["apps"].items():
+        anterior = baseline.get("apps", {}).get(app)
+        if not anterior:
+            continue
+        for nome, metricas in resultado["endpoints"].items():
+            antes = anterior["endpoints"].get(nome)
+            if not antes or "p95_ms" not in antes or "p95_ms" not in metricas:
+                continue
+            delta = (metricas["p95_ms"] - antes["p95_ms"]) / antes["p95_ms"] * 100 if antes["p95_ms"] else 0.0
+            print(f"  {app:>12} {nome:<28} p95 {antes['p95_ms']:9.1f} -> {metricas['p95_ms']:9.1f}ms ({delta:+.1f}%)",
+                  file=sys.stderr)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Teste de carga offline das três APIs, com OpenAI, Twilio e SMTP locais.")
+    parser.add_argument("--apps", default=",".join(APPS), help="Lista separada por vírgula: " + ", ".join(APPS))
+    parser.add_argument("--requests", type=int, default=300, help="Requisições autenticadas por app (além de registro/login).")
+    parser.add_argument("--concurrency", type=int, default=20, help="Usuários virtuais simultâneos por app.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--openai-latency", type=float, default=0.05)
+    parser.add_argument("--openai-token-delay", type=float, default=0.0)
+    parser.add_argument("--openai-rate-limit-every", type=int, default=0, help="Uma a cada N chamadas recebe 429.")
+    parser.add_argument("--twilio-latency", type=float, default=0.02)
+    parser.add_argument("--twilio-rate-limit-every", type=int, default=0)
+    parser.add_argument("--google-latency", type=float, default=0.1)
+    parser.add_argument("--google-error-every", type=int, default=0, help="Uma a cada N buscas recebe um 502 em HTML.")
+    parser.add_argument("--mongo-uri", default=None, help="mongod local; sem isso usa mongomock.")
+    parser.add_argument("--database", default="carga")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="Custo do bcrypt (padrão: o de BCRYPT_ROUNDS).")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de saída (padrão: stdout).")
+    parser.add_argument("--baseline", default=None, help="JSON de uma execução anterior para comparar o p95.")
+    args = parser.parse_args()
+    apps = [nome.strip() for nome in args.apps.split(",") if nome.strip()]
+
+    openai_stats, twilio_stats, google_stats = Counter(), Counter(), Counter()
+    openai_runner, openai_url = await start_server(fake_openai_app(
+        args.openai_latency, args.openai_token_delay, rate_limit_every=args.openai_rate_limit_every, stats=openai_stats))
+    twilio_runner, twilio_url = await start_server(fake_twilio_app(
+        args.twilio_latency, args.twilio_rate_limit_every, stats=twilio_stats))
+    google_runner, google_url = await start_server(fake_google_app(
+        args.google_latency, args.google_error_every, stats=google_stats))
+    smtp_server, smtp_sink, smtp_port = await start_smtp_sink()
+    configurar_ambiente(args, openai_url, twilio_url, google_url, smtp_port)
+
+    from database import database
+
+    if not args.mongo_uri:
+        from mongomock_motor import AsyncMongoMockClient
+
+        database.client = AsyncMongoMockClient()
+
+    run_id = uuid.uuid4().hex[:6]
+    resultado = {
+        "commit": commit_atual(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "apps": {},
+    }
+    # Os apps registram com print; stdout fica reservado para o JSON.
+    with redirect_stdout(sys.stderr):
+        modulos = {nome: importlib.import_module(APPS[nome]) for nome in apps}
+        async with AsyncExitStack() as stack:
+            for modulo in modulos.values():
+                await stack.enter_async_context(modulo.app.router.lifespan_context(modulo.app))
+            for nome, modulo in modulos.items():
+                print(f"{nome}: {args.requests} requisições, {args.concurrency} usuários virtuais...")
+                resultado["apps"][nome] = await executar(nome, modulo.app, args.requests, args.concurrency, args.seed, run_id)
+                if nome == "whatsapp":
+                    start = time.perf_counter()
+                    await modulo.inbound_queue.join()
+                    resultado["apps"][nome]["inbound_drain_s"] = round(time.perf_counter() - start, 3)
+    resultado["fakes"] = {
+        "openai": dict(openai_stats),
+        "twilio": dict(twilio_stats),
+        "google": dict(google_stats),
+        "smtp": {"messages": smtp_sink.messages, "recipients": smtp_sink.recipients},
+    }
+
+    smtp_server.close()
+    await openai_runner.cleanup()
+    await twilio_runner.cleanup()
+    await google_runner.cleanup()
+
+    for nome, app_resultado in resultado["apps"].items():
+        print(f"{nome:>12}: {app_resultado.get('rps', 0):8.1f} req/s  p50={app_resultado.get('p50_ms', 0):8.1f}ms  "
+              f"p95={app_resultado.get('p95_ms', 0):8.1f}ms  p99={app_resultado.get('p99_ms', 0):8.1f}ms  "
+              f"erros={app_resultado.get('errors', 0)}", file=sys.stderr)
+    if args.baseline:
+        comparar(resultado, args.baseline)
+
+    saida = json.dumps(resultado, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(saida + "\n")
+    else:
+        print(saida)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from sentiment import extract_sentiment_label
+
+load_dotenv()
+
+REPUTACAO_JANELA_DIAS = int(os.getenv("REPUTACAO_JANELA_DIAS", 30))
+
+SCORES = {"positivo": 1, "neutro": 0, "negativo": -1}
+
+
+def normalize_sentiment(sentimento: Optional[str]) -> Tuple[str, int]:
+    label = extract_sentiment_label(sentimento or "")
+    return label, SCORES[label]
+
+
+def empresa_key(empresa: str) -> str:
+    return " ".join(empresa.split()).casefold()
+
+
+def _day(quando: datetime) -> datetime:
+    return datetime(quando.year, quando.month, quando.day)
+
+
+class CompanyReputation:
+    """Agregados de avaliações por empresa mantidos com `$inc` atômicos.
+
+    `empresas_reputacao` guarda os totais de cada empresa e `empresas_reputacao_dias` um contador por
+    empresa e dia (com índice TTL), de onde sai a janela móvel. Cada avaliação contada recebe
+    `reputacao_contada: True`; o backfill só conta as que ainda não têm a marca, uma a uma e de forma
+    atômica, então pode rodar junto com as escritas normais.
+    """
+
+    def __init__(self, db, window_days: int = REPUTACAO_JANELA_DIAS):
+        self.reviews = db.avaliacoes
+        self.totals = db.empresas_reputacao
+        self.days = db.empresas_reputacao_dias
+        self.window_days = window_days
+
+    async def _inc(self, collection, _id, inc: dict, fields: dict):
+        update = {"$inc": inc, "$set": fields}
+        try:
+            await collection.update_one({"_id": _id}, update, upsert=True)
+        except DuplicateKeyError:
+            # Dois upserts simultâneos da mesma chave: na segunda tentativa o documento já existe.
+            await collection.update_one({"_id": _id}, update, upsert=True)
+
+    async def record(self, documentos: Iterable[dict], sign: int = 1):
+        """Soma (ou subtrai, com sign=-1) as avaliações nos agregados, um `$inc` por empresa e por dia."""
+        totals = defaultdict(lambda: defaultdict(int))
+        nomes = {}
+        days = defaultdict(lambda: defaultdict(int))
+        inicio = _day(datetime.utcnow()) - timedelta(days=self.window_days)
+        for documento in documentos:
+            label, score = normalize_sentiment(documento.get("sentimento"))
+            key = empresa_key(documento["empresa"])
+            nomes[key] = " ".join(documento["empresa"].split())
+            totals[key]["total"] += sign
+            totals[key][label] += sign
+            totals[key]["soma_score"] += sign * score
+            quando = documento.get("criado_em")
+            if quando is not None and _day(quando) >= inicio:
+                days[(key, _day(quando))]["total"] += sign
+                days[(key, _day(quando))][label] += sign
+        await asyncio.gather(
+            *(self._inc(self.totals, key, dict(inc), {"nome": nomes[key]}) for key, inc in totals.items()),
+            *(self._inc(self.days, f"{key}|{dia:%Y-%m-%d}", dict(inc), {"empresa": key, "dia": dia})
+              for (key, dia), inc in days.items()),
+        )
+
+    async def replace(self, antes: dict, depois: dict):
+        """Aplica a diferença entre duas versões de uma avaliação (retornadas por find_one_and_update)."""
+        if not antes.get("reputacao_contada"):
+            return
+        if empresa_key(antes["empresa"]) == empresa_key(depois["empresa"]) and \
+                normalize_sentiment(antes.get("sentimento"))[0] == normalize_sentiment(depois.get("sentimento"))[0]:
+            return
+        await self.record([antes], sign=-1)
+        await self.record([{**depois, "criado_em": antes.get("criado_em")}])
+
+    async def get(self, empresa: str) -> Optional[dict]:
+        key = empresa_key(empresa)
+        documento = await self.totals.find_one({"_id": key})
+        if documento is None or documento.get("total", 0) <= 0:
+            return None
+        inicio = _day(datetime.utcnow()) - timedelta(days=self.window_days)
+        dias = await self.days.find({"empresa": key, "dia": {"$gte": inicio}}).to_list(self.window_days + 1)
+        janela = {label: sum(dia.get(label, 0) for dia in dias) for label in ("total", *SCORES)}
+        total = documento["total"]
+        return {
+            "empresa": documento.get("nome", empresa),
+            "total": total,
+            **{label: documento.get(label, 0) for label in SCORES},
+            "proporcao_positiva": documento.get("positivo", 0) / total,
+            "score_medio": documento.get("soma_score", 0) / total,
+            "janela": {
+                "dias": self.window_days,
+                **janela,
+                "proporcao_positiva": janela["positivo"] / janela["total"] if janela["total"] else None,
+            },
+        }
+
+    async def backfill(self, limit: Optional[int] = None) -> dict:
+        contadas = 0
+        por_empresa = defaultdict(int)
+        cursor = self.reviews.find({"reputacao_contada": {"$ne": True}}, {"_id": 1})
+        async for item in cursor:
+            documento = await self.reviews.find_one_and_update(
+                {"_id": item["_id"], "reputacao_contada": {"$ne": True}},
+                {"$set": {"reputacao_contada": True}},
+            )
+            if documento is None or not documento.get("empresa"):
+                continue
+            await self.record([documento])
+            contadas += 1
+            por_empresa[empresa_key(documento["empresa"])] += 1
+            if limit is not None and contadas >= limit:
+                break
+        return {"avaliacoes": contadas, "empresas": len(por_empresa)}
+
+
+def main():
+    from database import database
+
+    parser = argparse.ArgumentParser(description="Conta nos agregados por empresa as avaliações ainda não contadas.")
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    async def run():
+        await database.connect()
+        try:
+            print(await CompanyReputation(database.get_database()).backfill(args.limit))
+        finally:
+            database.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
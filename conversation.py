@@ -0,0 +1,175 @@
+import asyncio
+import os
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, List, Optional
+
+from dotenv import load_dotenv
+
+from cache_utils import SingleFlight, TTLLRUCache
+
+load_dotenv()
+
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", 5000))
+CONVERSATION_IDLE_TTL = float(os.getenv("CONVERSATION_IDLE_TTL", 3600))
+CONVERSATION_BUFFER_TURNS = int(os.getenv("CONVERSATION_BUFFER_TURNS", 20))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", 1500))
+
+Summarizer = Callable[[str, List[dict]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximação de ~4 caracteres por token; suficiente para limitar o tamanho do prompt."""
+    return len(text) // 4 + 1
+
+
+class Conversation:
+    def __init__(self, number: str, turns: List[dict], summary: str = "", summarized_until=None):
+        self.number = number
+        self.turns: Deque[dict] = deque(turns)
+        self.summary = summary
+        self.summarized_until = summarized_until
+        self.summarizing = False
+
+    def unsummarized_tokens(self) -> int:
+        return sum(turn["tokens"] for turn in self.turns)
+
+
+class ConversationStore:
+    """Histórico por número de WhatsApp.
+
+    Todas as mensagens vão para um log append-only (`conversas`); as conversas ativas ficam num buffer
+    em memória com LRU + TTL de inatividade. O contexto enviado ao LLM é o resumo acumulado das mensagens
+    antigas mais os turnos recentes que cabem em `token_budget`. Quando o buffer passa do orçamento, os
+    turnos mais antigos são resumidos em segundo plano e persistidos em `conversas_resumos`.
+    """
+
+    def __init__(
+        self,
+        db,
+        summarize: Optional[Summarizer] = None,
+        maxsize: int = CONVERSATION_CACHE_SIZE,
+        idle_ttl: float = CONVERSATION_IDLE_TTL,
+        buffer_turns: int = CONVERSATION_BUFFER_TURNS,
+        token_budget: int = CONVERSATION_TOKEN_BUDGET,
+    ):
+        self.messages = db.conversas
+        self.summaries = db.conversas_resumos
+        self.summarize = summarize
+        self.active = TTLLRUCache(maxsize=maxsize, ttl=idle_ttl)
+        self.buffer_turns = buffer_turns
+        self.token_budget = token_budget
+        self.single_flight = SingleFlight()
+        self._tasks = set()
+        self.loads = 0
+        self.summaries_made = 0
+        self.summary_failures = 0
+        self.dropped_turns = 0
+
+    async def get(self, number: str) -> Conversation:
+        conversation = self.active.get(number)
+        if conversation is None:
+            conversation = await self.single_flight.do(number, lambda: self._load(number))
+        self.active.set(number, conversation)
+        return conversation
+
+    async def _load(self, number: str) -> Conversation:
+        self.loads += 1
+        resumo = await self.summaries.find_one({"_id": number}) or {}
+        filtro = {"numero": number}
+        if resumo.get("resumido_ate") is not None:
+            filtro["_id"] = {"$gt": resumo["resumido_ate"]}
+        documentos = await self.messages.find(filtro).sort("_id", -1).limit(self.buffer_turns).to_list(self.buffer_turns)
+        turns = [self._turn(documento) for documento in reversed(documentos)]
+        return Conversation(number, turns, resumo.get("resumo", ""), resumo.get("resumido_ate"))
+
+    @staticmethod
+    def _turn(documento: dict) -> dict:
+        return {
+            "_id": documento["_id"],
+            "role": documento["role"],
+            "content": documento["content"],
+            "tokens": estimate_tokens(documento["content"]),
+        }
+
+    async def append(self, number: str, role: str, content: str):
+        conversation = await self.get(number)
+        documento = {"numero": number, "role": role, "content": content, "criado_em": datetime.utcnow()}
+        await self.messages.insert_one(documento)
+        conversation.turns.append(self._turn(documento))
+        while len(conversation.turns) > self.buffer_turns * 2:
+            conversation.turns.popleft()
+            self.dropped_turns += 1
+        if conversation.unsummarized_tokens() > self.token_budget or len(conversation.turns) > self.buffer_turns:
+            self._schedule_summary(conversation)
+
+    async def context(self, number: str) -> List[dict]:
+        """Mensagens de histórico (resumo + turnos recentes) dentro do orçamento de tokens."""
+        conversation = await self.get(number)
+        budget = self.token_budget
+        messages = []
+        if conversation.summary:
+            budget -= estimate_tokens(conversation.summary)
+        for turn in reversed(conversation.turns):
+            if turn["tokens"] > budget:
+                break
+            budget -= turn["tokens"]
+            messages.append({"role": turn["role"], "content": turn["content"]})
+        messages.reverse()
+        if conversation.summary:
+            messages.insert(0, {"role": "system", "content": f"Resumo da conversa até aqui: {conversation.summary}"})
+        return messages
+
+    def _schedule_summary(self, conversation: Conversation):
+        if self.summarize is None or conversation.summarizing:
+            return
+        conversation.summarizing = True
+        task = asyncio.create_task(self._fold(conversation))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fold(self, conversation: Conversation):
+        """Resume os turnos mais antigos até sobrar metade do orçamento (e do buffer) em turnos literais."""
+        try:
+            keep_tokens = self.token_budget // 2
+            keep_turns = self.buffer_turns // 2
+            turns = list(conversation.turns)
+            kept_tokens = 0
+            split = len(turns)
+            while split > 0 and len(turns) - split < keep_turns and kept_tokens + turns[split - 1]["tokens"] <= keep_tokens:
+                split -= 1
+                kept_tokens += turns[split]["tokens"]
+            old = turns[:split]
+            if not old:
+                return
+            summary = await self.summarize(conversation.summary, old)
+            last_id = old[-1]["_id"]
+            await self.summaries.update_one(
+                {"_id": conversation.number},
+                {"$set": {"resumo": summary, "resumido_ate": last_id, "atualizado_em": datetime.utcnow()}},
+                upsert=True,
+            )
+            conversation.summary = summary
+            conversation.summarized_until = last_id
+            while conversation.turns and conversation.turns[0]["_id"] <= last_id:
+                conversation.turns.popleft()
+            self.summaries_made += 1
+        except Exception as e:
+            self.summary_failures += 1
+            print(f"Erro ao resumir conversa {conversation.number}: {e}")
+        finally:
+            conversation.summarizing = False
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active.stats(),
+            "loads": self.loads,
+            "summaries": self.summaries_made,
+            "summary_failures": self.summary_failures,
+            "dropped_turns": self.dropped_turns,
+            "token_budget": self.token_budget,
+        }
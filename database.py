@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from metrics import metrics, observe_call
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI")
+DATABASE_NAME = os.getenv("DATABASE_NAME")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Contadores do pool de conexões; os eventos chegam nas threads do driver."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        waited = getattr(event, "duration", None)
+        if waited is None:
+            waited = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": self.wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "pool_cleared": self.cleared,
+            }
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Tempo e falhas de cada comando enviado ao Mongo (find, insert, update...), por nome de comando."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        observe_call("mongodb", event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        observe_call("mongodb", event.command_name, event.duration_micros / 1e6, "error")
+
+
+class Database:
+    """Um único AsyncIOMotorClient por processo, compartilhado pelas três APIs.
+
+    O cliente é criado sem abrir conexões; `connect()` (no lifespan) valida o servidor com um ping
+    e `close()` fecha o pool quando o último app que chamou `connect()` é desligado.
+    """
+
+    def __init__(
+        self,
+        uri: Optional[str] = MONGO_URI,
+        name: Optional[str] = DATABASE_NAME,
+        max_pool_size: int = MONGO_MAX_POOL_SIZE,
+        min_pool_size: int = MONGO_MIN_POOL_SIZE,
+    ):
+        self.name = name
+        self.max_pool_size = max_pool_size
+        self.min_pool_size = min_pool_size
+        self.metrics = PoolMetrics()
+        self.client = AsyncIOMotorClient(
+            uri,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            event_listeners=[self.metrics, CommandMetrics()],
+        )
+        self.connected_at: Optional[float] = None
+        self._users = 0
+
+    def get_database(self, name: Optional[str] = None):
+        return self.client[name or self.name]
+
+    async def connect(self):
+        self._users += 1
+        if self.connected_at is not None:
+            return
+        start = time.perf_counter()
+        try:
+            await self.client.admin.command("ping")
+        except Exception:
+            self._users -= 1
+            raise
+        self.connected_at = time.time()
+        print(f"Conexão com MongoDB estabelecida em {(time.perf_counter() - start) * 1000:.1f}ms.")
+
+    def close(self):
+        self._users -= 1
+        if self._users > 0:
+            return
+        self.client.close()
+        self.connected_at = None
+        print("Conexão com MongoDB fechada.")
+
+    def stats(self) -> dict:
+        return {
+            "max_pool_size": self.max_pool_size,
+            "min_pool_size": self.min_pool_size,
+            "connected": self.connected_at is not None,
+            **self.metrics.stats(),
+        }
+
+
+database = Database()
+metrics.add_collector("mongodb", "Pool de conexões do MongoDB (database.stats()).", database.stats)
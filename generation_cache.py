@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from dotenv import load_dotenv
+
+from cache_utils import SingleFlight, TTLLRUCache
+
+load_dotenv()
+
+GENERATION_CACHE_SIZE = int(os.getenv("GENERATION_CACHE_SIZE", 1000))
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", 86400))
+GENERATION_CACHE_MONGO = os.getenv("GENERATION_CACHE_MONGO", "false").lower() in ("1", "true", "yes")
+
+
+def normalize_text(value: str) -> str:
+    """Forma canônica usada na chave: espaços colapsados e casefold ("Python" == "python")."""
+    return " ".join(value.split()).casefold()
+
+
+def normalize_list(values: List[str]) -> List[str]:
+    """Valores canônicos, sem repetição e ordenados: a chave não depende da ordem nem da caixa."""
+    return sorted({normalized for normalized in map(normalize_text, values) if normalized})
+
+
+def display_list(values: List[str]) -> List[str]:
+    """Mesmos itens de `normalize_list`, mas com a grafia original (a primeira de cada um) para ir no prompt."""
+    unicos = {}
+    for value in values:
+        value = " ".join(value.split())
+        if value:
+            unicos.setdefault(value.casefold(), value)
+    return sorted(unicos.values(), key=str.casefold)
+
+
+def generation_key(key_text: str, model: str, temperature: Optional[float]) -> str:
+    raw = json.dumps({"prompt": key_text, "model": model, "temperature": temperature}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Cache endereçado por conteúdo para respostas do LLM.
+
+    Primeiro nível em memória (LRU + TTL), segundo nível opcional numa coleção Mongo com índice TTL
+    em `expires_at`. Requisições idênticas simultâneas compartilham uma única chamada ao LLM.
+    `key_text` identifica a geração: o próprio prompt ou uma forma canônica das entradas que o geram.
+    """
+
+    def __init__(self, maxsize: int = GENERATION_CACHE_SIZE, ttl: float = GENERATION_CACHE_TTL, collection=None):
+        self.ttl = ttl
+        self.memory = TTLLRUCache(maxsize=maxsize, ttl=ttl)
+        self.collection = collection
+        self.single_flight = SingleFlight()
+        self.memory_hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.generation_seconds = 0.0
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get_or_generate(
+        self, key_text: str, model: str, temperature: Optional[float], generate: Callable[[], Awaitable[str]]
+    ) -> str:
+        key = generation_key(key_text, model, temperature)
+        cached = self._memory_lookup(key)
+        if cached is not None:
+            return cached
+        return await self.single_flight.do(key, lambda: self._load_or_generate(key, generate))
+
+    async def lookup(self, key_text: str, model: str, temperature: Optional[float]) -> Optional[str]:
+        """Consulta os dois níveis sem gerar; usado pelo modo streaming, que gera por conta própria."""
+        key = generation_key(key_text, model, temperature)
+        cached = self._memory_lookup(key)
+        if cached is None:
+            cached = await self._mongo_lookup(key)
+        if cached is None:
+            self.misses += 1
+        return cached
+
+    async def store(self, key_text: str, model: str, temperature: Optional[float], content: str, latency: float):
+        await self._store(generation_key(key_text, model, temperature), content, latency)
+
+    def _memory_lookup(self, key: str) -> Optional[str]:
+        cached = self.memory.get(key)
+        if cached is None:
+            return None
+        self.memory_hits += 1
+        self.saved_seconds += cached[1]
+        return cached[0]
+
+    async def _mongo_lookup(self, key: str) -> Optional[str]:
+        if self.collection is None:
+            return None
+        document = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        if document is None:
+            return None
+        self.mongo_hits += 1
+        self.saved_seconds += document.get("latency", 0.0)
+        self.memory.set(key, (document["content"], document.get("latency", 0.0)))
+        return document["content"]
+
+    async def _load_or_generate(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        cached = await self._mongo_lookup(key)
+        if cached is not None:
+            return cached
+        self.misses += 1
+        start = time.perf_counter()
+        content = await generate()
+        await self._store(key, content, time.perf_counter() - start)
+        return content
+
+    async def _store(self, key: str, content: str, latency: float):
+        self.generation_seconds += latency
+        self.memory.set(key, (content, latency))
+        if self.collection is not None:
+            now = datetime.utcnow()
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {"content": content, "latency": latency, "created_at": now, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True,
+            )
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.mongo_hits + self.single_flight.shared
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "mongo_hits": self.mongo_hits,
+            "coalesced": self.single_flight.shared,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "avg_generation_seconds": self.generation_seconds / self.misses if self.misses else 0.0,
+            "memory": self.memory.stats(),
+        }
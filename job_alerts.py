@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+load_dotenv()
+
+JOB_ALERT_INTERVAL = float(os.getenv("JOB_ALERT_INTERVAL", 0))
+JOB_ALERT_MAX_QUERIES = int(os.getenv("JOB_ALERT_MAX_QUERIES", 20))
+JOB_FEED_PATH = os.getenv("JOB_FEED_PATH")
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+
+def tokenize(text: Optional[str]) -> FrozenSet[str]:
+    if not text:
+        return frozenset()
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return frozenset(_TOKEN_RE.findall(text))
+
+
+class CompiledAlert:
+    __slots__ = ("alert_id", "email", "keywords", "location", "tipo_trabalho", "setor")
+
+    def __init__(self, alert: dict):
+        self.alert_id = str(alert.get("_id", ""))
+        self.email = alert["email"]
+        self.keywords = [tokens for tokens in (tokenize(k) for k in alert.get("palavras_chave", [])) if tokens]
+        self.location = tokenize(alert.get("localizacao"))
+        self.tipo_trabalho = tokenize(alert.get("tipo_trabalho"))
+        self.setor = tokenize(alert.get("setor"))
+
+    def score(self, tokens: FrozenSet[str]) -> int:
+        """0 quando a vaga não atende; caso contrário, palavras-chave atendidas + bônus por tipo/setor.
+
+        Exige pelo menos uma palavra-chave completa e, se informada, a localização (exceto 'remoto').
+        """
+        matched = sum(1 for keyword in self.keywords if keyword <= tokens)
+        if not matched:
+            return 0
+        if self.location and "remoto" not in self.location and not self.location <= tokens:
+            return 0
+        score = matched * 10
+        if self.tipo_trabalho and self.tipo_trabalho & tokens:
+            score += 3
+        if self.setor and self.setor & tokens:
+            score += 2
+        return score
+
+
+class AlertIndex:
+    """Índice invertido token -> alertas, indexado pelo token mais raro de cada palavra-chave."""
+
+    def __init__(self, alerts: Iterable[dict]):
+        self.alerts = [CompiledAlert(alert) for alert in alerts]
+        frequency = Counter(token for alert in self.alerts for keyword in alert.keywords for token in keyword)
+        self.index: Dict[str, List[int]] = defaultdict(list)
+        for position, alert in enumerate(self.alerts):
+            anchors = {min(keyword, key=lambda token: (frequency[token], token)) for keyword in alert.keywords}
+            for token in anchors:
+                self.index[token].append(position)
+
+    def match(self, posting: dict) -> List[Tuple[CompiledAlert, int]]:
+        tokens = tokenize(f"{posting.get('titulo', '')} {posting.get('resumo', '')}")
+        candidates = set()
+        for token in tokens:
+            candidates.update(self.index.get(token, ()))
+        matches = []
+        for position in candidates:
+            alert = self.alerts[position]
+            score = alert.score(tokens)
+            if score:
+                matches.append((alert, score))
+        return matches
+
+    def match_all(self, postings: Iterable[dict]) -> Dict[str, Dict[str, dict]]:
+        """Retorna {email: {link: sugestão}}, mantendo a maior pontuação de cada vaga por usuário."""
+        suggestions: Dict[str, Dict[str, dict]] = defaultdict(dict)
+        for posting in postings:
+            link = posting.get("link")
+            if not link:
+                continue
+            for alert, score in self.match(posting):
+                current = suggestions[alert.email].get(link)
+                if current is None or current["score"] < score:
+                    suggestions[alert.email][link] = {**posting, "score": score, "alerta_id": alert.alert_id}
+        return suggestions
+
+
+def search_queries(alerts: List[dict], limit: int = JOB_ALERT_MAX_QUERIES) -> List[str]:
+    """As combinações palavra-chave + localização mais pedidas, para caber na cota diária da busca."""
+    counts = Counter(
+        f"{keyword.strip().lower()} {alert.get('localizacao', '').strip().lower()}".strip()
+        for alert in alerts
+        for keyword in alert.get("palavras_chave", [])
+        if keyword.strip()
+    )
+    return [query for query, _ in counts.most_common(limit)]
+
+
+def load_feed(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class JobAlertMatcher:
+    """Coleta vagas, casa todos os alertas de `db.alertas` de uma vez e grava as sugestões em `db.sugestoes`.
+
+    Com `interval > 0` roda periodicamente, começando só depois do primeiro intervalo: reiniciar ou
+    recarregar o app não dispara buscas. Cada execução consome até JOB_ALERT_MAX_QUERIES da cota do Google.
+    """
+
+    def __init__(self, db, search=None, feed_path: Optional[str] = JOB_FEED_PATH, interval: float = JOB_ALERT_INTERVAL):
+        self.db = db
+        self.search = search
+        self.feed_path = feed_path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[dict] = None
+
+    async def collect_postings(self, alerts: List[dict]) -> List[dict]:
+        postings = []
+        if self.feed_path and os.path.exists(self.feed_path):
+            postings.extend(load_feed(self.feed_path))
+        if self.search is not None:
+            for query in search_queries(alerts):
+                try:
+                    page = await self.search(query)
+                except Exception as e:
+                    print(f"Erro ao buscar vagas para '{query}': {e}")
+                    continue
+                postings.extend(page["resultados"])
+        return postings
+
+    async def run_once(self, postings: Optional[List[dict]] = None) -> dict:
+        start = time.perf_counter()
+        alerts = await self.db.alertas.find(
+            {}, {"email": 1, "palavras_chave": 1, "localizacao": 1, "tipo_trabalho": 1, "setor": 1}
+        ).to_list(None)
+        if postings is None:
+            postings = await self.collect_postings(alerts)
+        index = AlertIndex(alerts)
+        suggestions = index.match_all(postings)
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"email": email, "link": link},
+                {"$set": {**suggestion, "email": email, "atualizado_em": now}, "$setOnInsert": {"criado_em": now}},
+                upsert=True,
+            )
+            for email, by_link in suggestions.items()
+            for link, suggestion in by_link.items()
+        ]
+        for offset in range(0, len(operations), 1000):
+            await self.db.sugestoes.bulk_write(operations[offset:offset + 1000], ordered=False)
+        self.last_run = {
+            "alertas": len(alerts),
+            "vagas": len(postings),
+            "sugestoes": len(operations),
+            "usuarios": len(suggestions),
+            "segundos": round(time.perf_counter() - start, 3),
+            "executado_em": now.isoformat(),
+        }
+        return self.last_run
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Erro ao processar alertas de vagas: {e}")
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
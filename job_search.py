@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+from dotenv import load_dotenv
+
+from cache_utils import SingleFlight, TTLLRUCache
+from metrics import track
+
+load_dotenv()
+
+GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
+GOOGLE_CX = os.getenv('GOOGLE_CX')
+GOOGLE_SEARCH_URL = os.getenv('GOOGLE_SEARCH_URL', 'https://www.googleapis.com/customsearch/v1')
+JOB_SEARCH_CACHE_SIZE = int(os.getenv('JOB_SEARCH_CACHE_SIZE', 5000))
+JOB_SEARCH_CACHE_TTL = float(os.getenv('JOB_SEARCH_CACHE_TTL', 3600))
+JOB_SEARCH_TIMEOUT = float(os.getenv('JOB_SEARCH_TIMEOUT', 10))
+RESULTS_PER_PAGE = 10
+MAX_START = 91
+
+
+class SearchError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+def project_results(payload: dict, start: int) -> dict:
+    items = payload.get("items") or []
+    total = int(payload.get("searchInformation", {}).get("totalResults", 0) or 0)
+    next_page = payload.get("queries", {}).get("nextPage") or []
+    next_start = next_page[0].get("startIndex") if next_page else None
+    if next_start is not None and next_start > MAX_START:
+        next_start = None
+    return {
+        "start": start,
+        "total": total,
+        "proxima_pagina": next_start,
+        "resultados": [
+            {
+                "titulo": item.get("title"),
+                "link": item.get("link"),
+                "resumo": item.get("snippet"),
+                "fonte": item.get("displayLink"),
+            }
+            for item in items
+        ],
+    }
+
+
+async def _error_message(response) -> str:
+    text = await response.text()
+    try:
+        message = json.loads(text).get("error", {}).get("message")
+    except (ValueError, AttributeError):
+        message = None
+    return message or f"Erro na busca do Google (HTTP {response.status})"
+
+
+class JobSearchClient:
+    """Busca no Google Custom Search com cliente HTTP compartilhado, cache TTL e coalescência de buscas iguais."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = GOOGLE_API_KEY,
+        cx: Optional[str] = GOOGLE_CX,
+        url: str = GOOGLE_SEARCH_URL,
+        cache_size: int = JOB_SEARCH_CACHE_SIZE,
+        cache_ttl: float = JOB_SEARCH_CACHE_TTL,
+        timeout: float = JOB_SEARCH_TIMEOUT,
+    ):
+        self.api_key = api_key
+        self.cx = cx
+        self.url = url
+        self.timeout = ClientTimeout(total=timeout)
+        self.cache = TTLLRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self.single_flight = SingleFlight()
+        self._session: Optional[ClientSession] = None
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=TCPConnector(limit=20, keepalive_timeout=30, ttl_dns_cache=300),
+                timeout=self.timeout,
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def search(self, query: str, start: int = 1) -> dict:
+        query = normalize_query(query)
+        start = max(1, min(start, MAX_START))
+        key = (query, start)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await self.single_flight.do(key, lambda: self._fetch(query, start))
+
+    async def _fetch(self, query: str, start: int) -> dict:
+        await self.start()
+        params = {"key": self.api_key or "", "cx": self.cx or "", "q": query, "start": start, "num": RESULTS_PER_PAGE}
+        self.upstream_calls += 1
+        with track("google_search", "search"):
+            try:
+                async with self._session.get(self.url, params=params) as response:
+                    if response.status >= 400:
+                        raise SearchError(response.status, await _error_message(response))
+                    payload = await response.json(content_type=None)
+                if not isinstance(payload, dict):
+                    raise SearchError(502, "Resposta inválida da busca do Google")
+            except SearchError:
+                self.upstream_errors += 1
+                raise
+            except asyncio.TimeoutError:
+                self.upstream_errors += 1
+                raise SearchError(504, "Tempo esgotado na busca do Google")
+            except (ClientError, ValueError) as e:
+                # ValueError cobre corpo que não é JSON (página de erro de proxy, resposta truncada).
+                self.upstream_errors += 1
+                raise SearchError(502, f"Falha na busca do Google: {e}")
+        results = project_results(payload, start)
+        self.cache.set((query, start), results)
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "coalesced": self.single_flight.shared,
+            "cache": self.cache.stats(),
+        }
+
+
+job_search = JobSearchClient()
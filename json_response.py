@@ -0,0 +1,26 @@
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse serializada com orjson; aceita `ObjectId` e `datetime` sem passar pelo jsonable_encoder.
+
+    Usada como `default_response_class` das três APIs. Rotas quentes podem devolver
+    `ORJSONResponse(documento)` diretamente para pular também a validação do response_model.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
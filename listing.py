@@ -0,0 +1,151 @@
+import base64
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from bson import ObjectId, json_util
+from bson.errors import BSONError
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+load_dotenv()
+
+LISTAGEM_LIMITE_PADRAO = int(os.getenv("LISTAGEM_LIMITE_PADRAO", 50))
+LISTAGEM_LIMITE_MAXIMO = int(os.getenv("LISTAGEM_LIMITE_MAXIMO", 500))
+EXPORTACAO_BATCH_SIZE = int(os.getenv("EXPORTACAO_BATCH_SIZE", 1000))
+
+
+def to_jsonable(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, size: int = 1) -> list:
+    """Valores de um cursor de `paginate`; qualquer coisa fora do formato esperado vira 400.
+
+    `size` é o número de valores (1 para `_id`, 2 para `sort_field` + `_id`). Documentos e listas são
+    recusados: dentro da consulta, um valor como `{"$ne": null}` viraria operador.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json_util.loads(raw)
+    except (ValueError, TypeError, BSONError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+    if not isinstance(values, list) or len(values) != size or any(isinstance(value, (dict, list)) for value in values):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+    return values
+
+
+def _keyset(sort_field: Optional[str], descending: bool, after: list) -> dict:
+    op = "$lt" if descending else "$gt"
+    if sort_field is None:
+        return {"_id": {op: after[0]}}
+    value, last_id = after
+    return {"$or": [{sort_field: {op: value}}, {sort_field: value, "_id": {op: last_id}}]}
+
+
+async def paginate(
+    collection,
+    filtro: dict,
+    projection: dict,
+    cursor: Optional[str] = None,
+    limite: int = LISTAGEM_LIMITE_PADRAO,
+    sort_field: Optional[str] = None,
+    descending: bool = False,
+) -> dict:
+    """Paginação por keyset em (`sort_field`, `_id`): custo constante por página, sem `skip`.
+
+    `proximo_cursor` é opaco para o cliente; `None` indica a última página.
+    """
+    limite = max(1, min(limite, LISTAGEM_LIMITE_MAXIMO))
+    query = dict(filtro)
+    if cursor:
+        after = decode_cursor(cursor, 1 if sort_field is None else 2)
+        query = {"$and": [filtro, _keyset(sort_field, descending, after)]}
+    direction = -1 if descending else 1
+    sort = [("_id", direction)] if sort_field is None else [(sort_field, direction), ("_id", direction)]
+    projection = {**projection, "_id": 1}
+    if sort_field is not None:
+        projection[sort_field] = 1
+    documentos = await collection.find(query, projection).sort(sort).limit(limite + 1).to_list(limite + 1)
+    proximo = None
+    if len(documentos) > limite:
+        documentos = documentos[:limite]
+        ultimo = documentos[-1]
+        proximo = encode_cursor([ultimo["_id"]] if sort_field is None else [ultimo.get(sort_field), ultimo["_id"]])
+    return {"itens": [to_jsonable(documento) for documento in documentos], "proximo_cursor": proximo}
+
+
+async def _iter_ndjson(cursor) -> AsyncIterator[bytes]:
+    linhas: List[str] = []
+    async for documento in cursor:
+        linhas.append(json.dumps(to_jsonable(documento), ensure_ascii=False))
+        if len(linhas) >= 200:
+            yield ("\n".join(linhas) + "\n").encode("utf-8")
+            linhas = []
+    if linhas:
+        yield ("\n".join(linhas) + "\n").encode("utf-8")
+
+
+async def _iter_csv(cursor, campos: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(campos)
+    linhas = 0
+    async for documento in cursor:
+        documento = to_jsonable(documento)
+        writer.writerow([
+            json.dumps(documento[campo], ensure_ascii=False) if isinstance(documento.get(campo), (dict, list))
+            else documento.get(campo, "")
+            for campo in campos
+        ])
+        linhas += 1
+        if linhas >= 200:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            linhas = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_response(
+    collection,
+    filtro: dict,
+    campos: List[str],
+    formato: str,
+    nome_arquivo: str,
+    batch_size: int = EXPORTACAO_BATCH_SIZE,
+) -> StreamingResponse:
+    """Exporta em NDJSON ou CSV percorrendo o cursor do Motor; a memória não cresce com o resultado."""
+    projection = {campo: 1 for campo in campos}
+    if "_id" not in campos:
+        projection["_id"] = 0
+    cursor = collection.find(filtro, projection).sort("_id", 1).batch_size(batch_size)
+    if formato == "ndjson":
+        corpo, media_type = _iter_ndjson(cursor), "application/x-ndjson"
+    elif formato == "csv":
+        corpo, media_type = _iter_csv(cursor, campos), "text/csv; charset=utf-8"
+    else:
+        raise HTTPException(status_code=400, detail="Formato deve ser 'ndjson' ou 'csv'.")
+    return StreamingResponse(
+        corpo,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}.{formato}"'},
+    )
@@ -0,0 +1,360 @@
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+from dotenv import load_dotenv
+
+from metrics import track
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_API_URL = os.getenv('OPENAI_API_URL', 'https://api.openai.com/v1/chat/completions')
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+LLM_POOL_LIMIT = int(os.getenv('LLM_POOL_LIMIT', 100))
+LLM_POOL_LIMIT_PER_HOST = int(os.getenv('LLM_POOL_LIMIT_PER_HOST', 20))
+LLM_KEEPALIVE_TIMEOUT = float(os.getenv('LLM_KEEPALIVE_TIMEOUT', 30))
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 10))
+LLM_TOTAL_TIMEOUT = float(os.getenv('LLM_TOTAL_TIMEOUT', 60))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 20))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', 1.0))
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', 30.0))
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('LLM_CIRCUIT_FAILURE_THRESHOLD', 5))
+LLM_CIRCUIT_RESET_TIMEOUT = float(os.getenv('LLM_CIRCUIT_RESET_TIMEOUT', 30.0))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMRateLimitError(LLMError):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMError):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuito do LLM aberto; nova tentativa em {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Abre após `failure_threshold` falhas seguidas e deixa passar uma chamada de teste após `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int = LLM_CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = LLM_CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.open_until = 0.0
+        self.open_seconds = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if self.state == "open":
+            if now < self.open_until:
+                raise CircuitOpenError(self.open_until - now)
+            self.state = "half_open"
+            self.open_seconds += now - self.opened_at
+        if self._probe_in_flight:
+            raise CircuitOpenError(self.reset_timeout)
+        self._probe_in_flight = True
+
+    def release_probe(self):
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.state = "closed"
+        self._probe_in_flight = False
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            now = time.monotonic()
+            if self.state != "open":
+                self.times_opened += 1
+                self.opened_at = now
+            self.state = "open"
+            self.open_until = now + max(self.reset_timeout, retry_after or 0.0)
+
+    def stats(self) -> dict:
+        open_seconds = self.open_seconds
+        if self.state == "open":
+            open_seconds += time.monotonic() - self.opened_at
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "open_seconds": round(open_seconds, 3),
+        }
+
+
+class LLMClient:
+    """Cliente HTTP único para a API do OpenAI, com pool de conexões keep-alive.
+
+    Cada chamada passa por um limitador de concorrência, por um circuit breaker e é repetida
+    com backoff exponencial com jitter (respeitando `Retry-After`) em 429/5xx e erros de rede.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = OPENAI_API_KEY,
+        url: str = OPENAI_API_URL,
+        limit: int = LLM_POOL_LIMIT,
+        limit_per_host: int = LLM_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = LLM_KEEPALIVE_TIMEOUT,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        total_timeout: float = LLM_TOTAL_TIMEOUT,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.api_key = api_key
+        self.url = url
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = ClientTimeout(total=total_timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[ClientSession] = None
+        self._users = 0
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    async def start(self):
+        """Cada serviço que usa o cliente chama start/close; a sessão só fecha com o último (como `Database`)."""
+        self._users += 1
+        await self._open()
+
+    async def _open(self):
+        if self._session is not None and not self._session.closed:
+            return
+        connector = TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        self._session = ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        )
+
+    async def close(self):
+        self._users = max(self._users - 1, 0)
+        if self._users > 0:
+            return
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def session(self) -> ClientSession:
+        if self._session is None or self._session.closed:
+            await self._open()
+        return self._session
+
+    async def chat_completion(self, messages: List[dict], model: str = OPENAI_MODEL, temperature: Optional[float] = None) -> str:
+        payload = {"model": model, "messages": messages}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.circuit_breaker.before_call()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+            try:
+                content = await self._post(payload)
+            except (LLMRateLimitError, ClientError, asyncio.TimeoutError) as e:
+                retry_after = getattr(e, "retry_after", None)
+                self.circuit_breaker.record_failure(retry_after)
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+                continue
+            except LLMError:
+                self.circuit_breaker.record_success()
+                raise
+            except asyncio.CancelledError:
+                self.circuit_breaker.release_probe()
+                raise
+            except Exception:
+                self.circuit_breaker.record_failure()
+                raise
+            self.circuit_breaker.record_success()
+            return content
+
+    async def stream_chat_completion(
+        self, messages: List[dict], model: str = OPENAI_MODEL, temperature: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Produz os trechos de texto (`delta.content`) à medida que chegam.
+
+        Só repete a chamada se a falha ocorrer antes do primeiro trecho.
+        """
+        payload = {"model": model, "messages": messages, "stream": True}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.circuit_breaker.before_call()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+            started = False
+            try:
+                session = await self.session()
+                async with self._slot("chat_completion_stream"):
+                    async with session.post(self.url, json=payload) as response:
+                        if response.status >= 400:
+                            self._raise_for_status(response, await response.text())
+                        async for line in response.content:
+                            line = line.strip()
+                            if not line.startswith(b"data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == b"[DONE]":
+                                break
+                            delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                            if delta:
+                                started = True
+                                yield delta
+            except (LLMRateLimitError, ClientError, asyncio.TimeoutError) as e:
+                retry_after = getattr(e, "retry_after", None)
+                self.circuit_breaker.record_failure(retry_after)
+                if started or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+                continue
+            except LLMError:
+                self.circuit_breaker.record_success()
+                raise
+            except (asyncio.CancelledError, GeneratorExit):
+                self.circuit_breaker.release_probe()
+                raise
+            except Exception:
+                self.circuit_breaker.record_failure()
+                raise
+            self.circuit_breaker.record_success()
+            return
+
+    @asynccontextmanager
+    async def _slot(self, operation: str = "chat_completion"):
+        queued_at = time.monotonic()
+        self.waiting += 1
+        async with self._semaphore:
+            self.waiting -= 1
+            wait = time.monotonic() - queued_at
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            self.requests += 1
+            self.in_flight += 1
+            try:
+                with track("openai", operation):
+                    yield
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    def _raise_for_status(self, response, body):
+        if response.status in RETRYABLE_STATUS:
+            retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            if response.status == 429:
+                self.rate_limited += 1
+            raise LLMRateLimitError(f"{response.status}: {body}", retry_after)
+        raise LLMError(f"{response.status}: {body}")
+
+    async def _post(self, payload: dict) -> str:
+        session = await self.session()
+        async with self._slot():
+            async with session.post(self.url, json=payload) as response:
+                # Status antes do corpo: um 502/503 de proxy costuma vir em HTML e ainda precisa do retry.
+                if response.status >= 400:
+                    self._raise_for_status(response, await response.text())
+                try:
+                    response_data = await response.json(content_type=None)
+                    return response_data['choices'][0]['message']['content']
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    raise LLMError(f"Resposta inválida da OpenAI: {e}")
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def pool_stats(self) -> dict:
+        stats = {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "acquired": 0,
+            "idle": 0,
+        }
+        if self._session is not None and not self._session.closed:
+            connector = self._session.connector
+            stats["acquired"] = len(getattr(connector, "_acquired", ()))
+            stats["idle"] = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "pool": self.pool_stats(),
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "rejected_open_circuit": self.rejected,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "queue_wait_avg": self.queue_wait_total / self.requests if self.requests else 0.0,
+            "queue_wait_max": self.queue_wait_max,
+            "circuit": self.circuit_breaker.stats(),
+        }
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+llm_client = LLMClient()
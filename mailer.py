@@ -0,0 +1,259 @@
+import asyncio
+import os
+import random
+from collections import deque
+from dataclasses import dataclass
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import TYPE_CHECKING, Deque, List, Optional
+
+from dotenv import load_dotenv
+
+from metrics import track
+
+if TYPE_CHECKING:
+    import aiosmtplib
+
+load_dotenv()
+
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+SMTP_USER = os.getenv("SMTP_MAIL")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", str(SMTP_PORT == 465)).lower() in ("1", "true", "yes")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+SMTP_BATCH_SIZE = int(os.getenv("SMTP_BATCH_SIZE", 20))
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", 5))
+SMTP_QUEUE_SIZE = int(os.getenv("SMTP_QUEUE_SIZE", 10000))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+MAIL_SPOOL_PATH = os.getenv("MAIL_SPOOL_PATH")
+MAIL_DEAD_LETTERS_MAX = int(os.getenv("MAIL_DEAD_LETTERS_MAX", 1000))
+
+
+class MailQueueFull(Exception):
+    pass
+
+
+@dataclass
+class MailJob:
+    message: EmailMessage
+    attempts: int = 0
+
+
+class Mailer:
+    """Fila de envio de e-mails com conexões SMTP persistentes, retry com backoff e envio em lote.
+
+    Cada worker mantém uma sessão SMTP autenticada e envia até `batch_size` mensagens por vez
+    nela. Mensagens não entregues no desligamento, inclusive as do lote que um worker tinha em mãos
+    quando foi cancelado, são gravadas em `spool_path` (se configurado) e recarregadas no próximo
+    `start()`. Só as últimas `dead_letters_max` mensagens que esgotaram as tentativas ficam em memória.
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = SMTP_HOST,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USER,
+        password: Optional[str] = SMTP_PASSWORD,
+        use_tls: bool = SMTP_USE_TLS,
+        pool_size: int = SMTP_POOL_SIZE,
+        batch_size: int = SMTP_BATCH_SIZE,
+        max_retries: int = SMTP_MAX_RETRIES,
+        queue_size: int = SMTP_QUEUE_SIZE,
+        timeout: float = SMTP_TIMEOUT,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        spool_path: Optional[str] = MAIL_SPOOL_PATH,
+        dead_letters_max: int = MAIL_DEAD_LETTERS_MAX,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.spool_path = spool_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._retries = {}
+        self._in_flight: List[Deque[MailJob]] = []
+        self.dead_letters: Deque[MailJob] = deque(maxlen=dead_letters_max)
+        self.dead_letters_total = 0
+        self.sent = 0
+        self.failed_attempts = 0
+        self.batches = 0
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        for job in self._load_spool():
+            self._queue.put_nowait(job)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.pool_size)]
+
+    async def enqueue(self, message: EmailMessage):
+        if self._queue is None:
+            await self.start()
+        try:
+            self._queue.put_nowait(MailJob(message))
+        except asyncio.QueueFull:
+            raise MailQueueFull("Fila de e-mails cheia.")
+
+    async def flush(self, timeout: Optional[float] = None):
+        if self._queue is not None:
+            await asyncio.wait_for(self._queue.join(), timeout)
+
+    async def close(self, timeout: float = 10.0):
+        if self._queue is None:
+            return
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        pending = [job for in_flight in self._in_flight for job in in_flight]
+        self._in_flight = []
+        for handle, job in self._retries.values():
+            handle.cancel()
+            pending.append(job)
+        self._retries.clear()
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._save_spool(pending)
+        self._workers = []
+        self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "waiting_retry": len(self._retries),
+            "sent": self.sent,
+            "failed_attempts": self.failed_attempts,
+            "dead_letters": len(self.dead_letters),
+            "dead_letters_total": self.dead_letters_total,
+            "batches": self.batches,
+            "pool_size": self.pool_size,
+        }
+
+    async def _connect(self) -> "aiosmtplib.SMTP":
+        # aiosmtplib só é importado quando o primeiro e-mail sai da fila.
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(hostname=self.host, port=self.port, use_tls=self.use_tls, timeout=self.timeout)
+        with track("smtp", "connect"):
+            await smtp.connect()
+            if self.username and self.password:
+                await smtp.login(self.username, self.password)
+        return smtp
+
+    async def _ensure_connected(self, smtp: Optional["aiosmtplib.SMTP"]) -> "aiosmtplib.SMTP":
+        if smtp is not None and smtp.is_connected:
+            import aiosmtplib
+
+            try:
+                await smtp.noop()
+                return smtp
+            except aiosmtplib.SMTPException:
+                smtp.close()
+        return await self._connect()
+
+    async def _next_batch(self) -> List[MailJob]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _worker(self):
+        smtp: Optional["aiosmtplib.SMTP"] = None
+        # Jobs do lote atual ainda não enviados nem reagendados; um job só sai daqui depois de tratado,
+        # então um cancelamento no meio do lote deixa aqui o que `close()` precisa gravar no spool.
+        in_flight: Deque[MailJob] = deque()
+        self._in_flight.append(in_flight)
+        try:
+            while True:
+                in_flight.extend(await self._next_batch())
+                try:
+                    smtp = await self._ensure_connected(smtp)
+                except Exception as e:
+                    print(f"Erro ao conectar ao servidor SMTP: {e}")
+                    smtp = None
+                    while in_flight:
+                        self._retry(in_flight.popleft())
+                    continue
+                self.batches += 1
+                while in_flight:
+                    job = in_flight[0]
+                    if smtp is None:
+                        self._retry(job, count_attempt=False)
+                    else:
+                        try:
+                            with track("smtp", "send_message"):
+                                await smtp.send_message(job.message)
+                            self.sent += 1
+                            self._queue.task_done()
+                        except Exception as e:
+                            print(f"Erro ao enviar e-mail: {e}")
+                            self._retry(job)
+                            if not smtp.is_connected:
+                                smtp = None
+                    in_flight.popleft()
+        finally:
+            if smtp is not None and smtp.is_connected:
+                smtp.close()
+
+    def _retry(self, job: MailJob, count_attempt: bool = True):
+        if count_attempt:
+            job.attempts += 1
+            self.failed_attempts += 1
+        self._queue.task_done()
+        if job.attempts > self.max_retries:
+            self.dead_letters.append(job)
+            self.dead_letters_total += 1
+            return
+        delay = 0
+        if count_attempt:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** job.attempts) * random.uniform(0.5, 1.0)
+        handle = asyncio.get_running_loop().call_later(delay, self._requeue, job)
+        self._retries[id(job)] = (handle, job)
+
+    def _requeue(self, job: MailJob):
+        self._retries.pop(id(job), None)
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            handle = asyncio.get_running_loop().call_later(self.backoff_base, self._requeue, job)
+            self._retries[id(job)] = (handle, job)
+
+    def _load_spool(self) -> List[MailJob]:
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return []
+        with open(self.spool_path, "rb") as f:
+            raw = f.read()
+        os.remove(self.spool_path)
+        return [
+            MailJob(message_from_bytes(chunk, policy=policy.default))
+            for chunk in raw.split(b"\n\x00\n") if chunk.strip()
+        ]
+
+    def _save_spool(self, jobs: List[MailJob]):
+        if not jobs:
+            return
+        if not self.spool_path:
+            print(f"{len(jobs)} e-mail(s) não entregues descartados no desligamento.")
+            return
+        with open(self.spool_path, "ab") as f:
+            for job in jobs:
+                f.write(job.message.as_bytes() + b"\n\x00\n")
+
+
+mailer = Mailer()
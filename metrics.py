@@ -0,0 +1,247 @@
+import asyncio
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi.responses import Response
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels: tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos; as contagens por bucket só viram cumulativas no render."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, *labels) -> int:
+        state = self._values.get(labels)
+        return sum(state[0]) if state else 0
+
+    def _render_sample(self, labels: tuple, state) -> List[str]:
+        with self._lock:
+            counts, total = list(state[0]), state[1]
+        names = self.labelnames + ("le",)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+        label_text = _format_labels(self.labelnames, labels)
+        lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+        lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Métricas do processo em formato de texto do Prometheus.
+
+    Além das métricas registradas, `add_collector` aceita funções `stats()` já existentes (pool do
+    Mongo, caches): os valores numéricos viram gauges `<prefixo>_<chave>` no momento do scrape.
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Tuple[str, str, Callable[[], dict]]] = []
+
+    def _add(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, prefix: str, help: str, stats: Callable[[], dict]):
+        self._collectors.append((prefix, help, stats))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, help, stats in self._collectors:
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Erro ao coletar métricas de {prefix}: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# HELP {prefix}_{key} {help}")
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUESTS = metrics.counter("http_requests_total", "Requisições HTTP atendidas.", ("app", "method", "route", "status"))
+HTTP_DURATION = metrics.histogram("http_request_duration_seconds", "Latência das requisições HTTP.", ("app", "method", "route"))
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Requisições HTTP em andamento.", ("app",))
+UPSTREAM_CALLS = metrics.counter("upstream_calls_total", "Chamadas a dependências externas.", ("dependency", "operation", "outcome"))
+UPSTREAM_DURATION = metrics.histogram(
+    "upstream_call_duration_seconds", "Latência das chamadas a dependências externas.", ("dependency", "operation")
+)
+
+
+def observe_call(dependency: str, operation: str, seconds: float, outcome: str = "ok"):
+    if not METRICS_ENABLED:
+        return
+    UPSTREAM_DURATION.observe(seconds, dependency, operation)
+    UPSTREAM_CALLS.inc(dependency, operation, outcome)
+
+
+class track:
+    """Mede uma chamada externa: `with track("openai", "chat_completion") as call:`.
+
+    Exceções contam como `error` (cancelamento como `cancelled`); respostas de erro que não levantam
+    exceção são marcadas com `call.fail()`.
+    """
+
+    __slots__ = ("dependency", "operation", "start", "failed")
+
+    def __init__(self, dependency: str, operation: str):
+        self.dependency = dependency
+        self.operation = operation
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            outcome = "cancelled"
+        elif exc_type is not None or self.failed:
+            outcome = "error"
+        else:
+            outcome = "ok"
+        observe_call(self.dependency, self.operation, time.perf_counter() - self.start, outcome)
+        return False
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware, que custa uma task por requisição).
+
+    A rota vem do template (`/curriculo/{nome}/`), não da URL, para manter a cardinalidade baixa.
+    """
+
+    def __init__(self, app, app_name: str):
+        self.app = app
+        self.app_name = app_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(self.app_name)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec(self.app_name)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_DURATION.observe(elapsed, self.app_name, scope["method"], route)
+            HTTP_REQUESTS.inc(self.app_name, scope["method"], route, str(status[0]))
+
+
+def metrics_response(registry: Optional[MetricsRegistry] = None) -> Response:
+    return Response((registry or metrics).render(), media_type=CONTENT_TYPE)
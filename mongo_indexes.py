@@ -0,0 +1,184 @@
+import os
+from typing import Dict, List, Optional, Tuple, Union
+
+from dotenv import load_dotenv
+from pymongo.errors import OperationFailure
+
+from company_reputation import REPUTACAO_JANELA_DIAS
+
+load_dotenv()
+
+MONGO_CHECK_PLANS = os.getenv("MONGO_CHECK_PLANS", os.getenv("DEBUG", "false")).lower() in ("1", "true", "yes")
+SUGESTOES_TTL = int(os.getenv("SUGESTOES_TTL", 30 * 86400))
+
+Keys = Union[str, List[Tuple[str, int]]]
+
+
+class QueryPlanError(Exception):
+    def __init__(self, scans: List[dict]):
+        nomes = ", ".join(f"{scan['nome']} ({scan['collection']})" for scan in scans)
+        super().__init__(f"Consultas sem índice (COLLSCAN): {nomes}")
+        self.scans = scans
+
+
+def _normalize_keys(keys: Keys) -> List[Tuple[str, int]]:
+    return [(keys, 1)] if isinstance(keys, str) else list(keys)
+
+
+def _plan_stages(plan) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+class IndexManager:
+    """Registro de índices e consultas quentes de um banco.
+
+    `bootstrap()` cria os índices no startup; com MONGO_CHECK_PLANS (ou DEBUG) roda `explain()` nas
+    consultas registradas e levanta QueryPlanError se alguma fizer COLLSCAN. Sem `explain()` (mongomock),
+    a verificação compara os campos do filtro com o prefixo dos índices existentes.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.indexes: List[Tuple[str, List[Tuple[str, int]], dict]] = []
+        self.obsolete: List[Tuple[str, str]] = []
+        self.hot_queries: List[dict] = []
+
+    def add_index(self, collection: str, keys: Keys, **options):
+        keys = _normalize_keys(keys)
+        options.setdefault("name", "_".join(f"{field}_{direction}" for field, direction in keys))
+        self.indexes.append((collection, keys, options))
+
+    def drop_index(self, collection: str, name: str):
+        """Índice substituído por outro com outras opções; removido no startup se ainda existir."""
+        self.obsolete.append((collection, name))
+
+    def add_hot_query(self, nome: str, collection: str, filtro: dict, sort: Optional[Keys] = None):
+        self.hot_queries.append({
+            "nome": nome,
+            "collection": collection,
+            "filtro": filtro,
+            "sort": _normalize_keys(sort) if sort else None,
+        })
+
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        created: Dict[str, List[str]] = {}
+        for collection, name in self.obsolete:
+            try:
+                await self.db[collection].drop_index(name)
+                print(f"Índice obsoleto {name} removido de {collection}.")
+            except OperationFailure:
+                pass
+        for collection, keys, options in self.indexes:
+            try:
+                name = await self.db[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                print(f"Erro ao criar índice {options['name']} em {collection}: {e}")
+                continue
+            created.setdefault(collection, []).append(name)
+        return created
+
+    async def explain(self, query: dict) -> dict:
+        collection = self.db[query["collection"]]
+        cursor = collection.find(query["filtro"])
+        if query["sort"]:
+            cursor = cursor.sort(query["sort"])
+        try:
+            plan = await cursor.explain()
+        except (AttributeError, NotImplementedError):
+            return await self._static_plan(collection, query)
+        stages = _plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+        return {"nome": query["nome"], "collection": query["collection"], "stages": stages, "fonte": "explain"}
+
+    async def _static_plan(self, collection, query: dict) -> dict:
+        fields = set(query["filtro"]) or {field for field, _ in query["sort"] or []}
+        indexes = await collection.index_information()
+        for name, info in indexes.items():
+            if info["key"][0][0] in fields:
+                return {"nome": query["nome"], "collection": query["collection"], "stages": ["IXSCAN"],
+                        "indice": name, "fonte": "indices"}
+        return {"nome": query["nome"], "collection": query["collection"], "stages": ["COLLSCAN"], "fonte": "indices"}
+
+    async def check_query_plans(self) -> List[dict]:
+        plans = [await self.explain(query) for query in self.hot_queries]
+        scans = [plan for plan in plans if "COLLSCAN" in plan["stages"]]
+        if scans:
+            raise QueryPlanError(scans)
+        return plans
+
+    async def bootstrap(self, check_plans: bool = MONGO_CHECK_PLANS) -> dict:
+        created = await self.ensure_indexes()
+        print(f"Índices garantidos: {created}")
+        if not check_plans:
+            return {"indices": created}
+        plans = await self.check_query_plans()
+        for plan in plans:
+            print(f"Plano de '{plan['nome']}': {' > '.join(plan['stages'])}")
+        return {"indices": created, "planos": plans}
+
+
+def unique_when_present(field: str) -> dict:
+    """Unicidade só para documentos que têm o campo (`users` é compartilhada entre serviços)."""
+    return {"unique": True, "partialFilterExpression": {field: {"$exists": True}}}
+
+
+def register_users(manager: IndexManager, collection: str = "users", email_scope: Optional[str] = None):
+    """Índices de usuários. Com `email_scope`, o e-mail só é único entre os documentos que têm esse campo.
+
+    Recrutamento e currículos gravam na mesma `users`: cada um passa um campo que só ele escreve
+    (`username` e `jobtitle`), e a mesma pessoa pode ter conta nos dois. A busca por e-mail usa um
+    índice comum, porque o parcial só atende consultas que também filtram pelo campo do escopo.
+    """
+    manager.add_index(collection, "username", **unique_when_present("username"))
+    if email_scope is None:
+        manager.add_index(collection, "email", **unique_when_present("email"))
+    else:
+        manager.drop_index(collection, "email_1")
+        manager.add_index(collection, "email", name="email_busca")
+        manager.add_index(
+            collection, "email", name=f"email_unico_{email_scope}", unique=True,
+            partialFilterExpression={"email": {"$exists": True}, email_scope: {"$exists": True}},
+        )
+    manager.add_hot_query("usuario por username", collection, {"username": "x"})
+    manager.add_hot_query("usuario por email", collection, {"email": "x"})
+
+
+def register_conversas(manager: IndexManager):
+    manager.add_index("conversas", [("numero", 1), ("_id", -1)])
+    manager.add_hot_query("mensagens recentes por numero", "conversas", {"numero": "x"}, [("_id", -1)])
+
+
+def register_mensagens_recebidas(manager: IndexManager, ttl: float):
+    manager.add_index("mensagens_recebidas", "recebida_em", expireAfterSeconds=int(ttl))
+
+
+def register_recrutamento(manager: IndexManager):
+    register_users(manager, email_scope="username")
+    manager.add_index("alertas", [("email", 1), ("_id", 1)])
+    manager.add_index("avaliacoes", [("empresa", 1), ("_id", 1)])
+    manager.add_index("sugestoes", [("email", 1), ("link", 1)], unique=True)
+    manager.add_index("sugestoes", [("email", 1), ("score", -1), ("_id", -1)])
+    manager.add_index("sugestoes", "atualizado_em", expireAfterSeconds=SUGESTOES_TTL)
+    manager.add_hot_query("alertas por email", "alertas", {"email": "x"})
+    manager.add_index("empresas_reputacao_dias", [("empresa", 1), ("dia", 1)])
+    manager.add_index("empresas_reputacao_dias", "dia", expireAfterSeconds=(REPUTACAO_JANELA_DIAS + 1) * 86400)
+    manager.add_hot_query("avaliacoes por empresa", "avaliacoes", {"empresa": "x"})
+    manager.add_hot_query("janela de reputacao por empresa", "empresas_reputacao_dias", {"empresa": "x", "dia": {"$gte": 0}})
+    manager.add_hot_query("sugestoes por email", "sugestoes", {"email": "x"}, [("score", -1)])
+
+
+def register_curriculos(manager: IndexManager):
+    register_users(manager, email_scope="jobtitle")
+    manager.add_index("curriculos", "input_hash", **unique_when_present("input_hash"))
+    manager.add_index("curriculos", [("nome", 1), ("criado_em", -1)])
+    manager.add_index("curriculos", [("nome", 1), ("_id", 1)])
+    manager.add_hot_query("curriculo por entrada", "curriculos", {"input_hash": "x", "parcial": {"$ne": True}})
+    manager.add_hot_query("curriculo mais recente por nome", "curriculos", {"nome": "x"}, [("criado_em", -1)])
@@ -0,0 +1,74 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+class PasswordHasher:
+    """Executa o bcrypt num pool de threads limitado, fora do event loop.
+
+    O bcrypt libera o GIL durante o cálculo, então threads bastam para paralelizar.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, workers: int = PASSWORD_HASH_WORKERS):
+        self.rounds = rounds
+        self.workers = workers
+        self._context = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._users = 0
+
+    @property
+    def context(self):
+        # passlib só é importado no primeiro hash/verificação, fora do caminho de startup.
+        if self._context is None:
+            from passlib.context import CryptContext
+
+            self._context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=self.rounds)
+        return self._context
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def hash(self, password: str) -> str:
+        if isinstance(password, bytes):
+            password = password.decode('utf-8')
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if not hashed_password:
+            return False
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Retorna (válido, novo_hash); novo_hash só é preenchido quando o custo configurado mudou."""
+        if not hashed_password:
+            return False, None
+        return await self._run(self.context.verify_and_update, plain_password, hashed_password)
+
+    def start(self):
+        # O pool de threads é criado no primeiro uso; start só conta quem está usando o hasher.
+        self._users += 1
+
+    def close(self):
+        self._users = max(self._users - 1, 0)
+        if self._users > 0:
+            return
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", min(2, os.cpu_count() or 1)))
+
+FONTS = ("Helvetica", "Helvetica-Bold")
+
+
+def _init_worker():
+    # Importa o reportlab e carrega as métricas das fontes uma única vez por processo.
+    from reportlab.pdfbase import pdfmetrics
+
+    for font in FONTS:
+        pdfmetrics.getFont(font)
+
+
+def criar_curriculo_pdf(nome, local, telefone, email, experiencia, habilidades, educacao, projetos, caminho_arquivo):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(caminho_arquivo, pagesize=letter)
+    pdf.setTitle(f"Currículo de {nome}")
+
+    margem_esquerda, margem_superior, linha_espaco = 100, 750, 20
+
+    pdf.setFont("Helvetica-Bold", 20)
+    pdf.drawString(margem_esquerda, margem_superior, nome)
+
+    pdf.setFont("Helvetica", 12)
+    pdf.drawString(margem_esquerda, margem_superior - linha_espaco, f"{local} – {telefone} – {email}")
+
+    def adicionar_secao(titulo, conteudo, y_pos):
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(margem_esquerda, y_pos, titulo)
+        pdf.setFont("Helvetica", 12)
+        text = pdf.beginText(margem_esquerda, y_pos - linha_espaco)
+        text.textLines(conteudo)
+        pdf.drawText(text)
+
+    adicionar_secao("Experiência Profissional:", experiencia, margem_superior - linha_espaco * 3)
+    adicionar_secao("Habilidades e Interesses:", habilidades, margem_superior - linha_espaco * 8)
+    adicionar_secao("Educação:", educacao, margem_superior - linha_espaco * 12)
+    adicionar_secao("Projetos Técnicos:", projetos, margem_superior - linha_espaco * 16)
+
+    pdf.save()
+
+
+def render_curriculo(dados: dict) -> Tuple[bytes, float]:
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    criar_curriculo_pdf(caminho_arquivo=buffer, **dados)
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+class PdfRenderer:
+    """Renderiza currículos num pool de processos, em memória, sem arquivos temporários.
+
+    Com `workers=0` a renderização roda numa thread do próprio processo.
+    """
+
+    def __init__(self, workers: int = PDF_RENDER_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._users = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+        self.max_render_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def start(self):
+        self._users += 1
+        self._ensure_executor()
+
+    def _ensure_executor(self):
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def close(self):
+        self._users = max(self._users - 1, 0)
+        if self._users > 0:
+            return
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def render(self, dados: dict) -> Tuple[bytes, float]:
+        """Retorna o PDF e o tempo de renderização no worker, em segundos."""
+        start = time.perf_counter()
+        if self.workers > 0:
+            self._ensure_executor()
+            loop = asyncio.get_running_loop()
+            pdf, seconds = await loop.run_in_executor(self._executor, render_curriculo, dados)
+        else:
+            pdf, seconds = await asyncio.to_thread(render_curriculo, dados)
+        self.renders += 1
+        self.render_seconds += seconds
+        self.max_render_seconds = max(self.max_render_seconds, seconds)
+        self.wait_seconds += time.perf_counter() - start - seconds
+        return pdf, seconds
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "renders": self.renders,
+            "avg_render_seconds": self.render_seconds / self.renders if self.renders else 0.0,
+            "max_render_seconds": self.max_render_seconds,
+            "avg_overhead_seconds": self.wait_seconds / self.renders if self.renders else 0.0,
+        }
+
+
+pdf_renderer = PdfRenderer()
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+load_dotenv()
+
+RESUME_STORE_DIR = os.getenv("RESUME_STORE_DIR", "storage/curriculos")
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def input_hash(dados: dict) -> str:
+    raw = json.dumps(dados, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResumeStore:
+    """PDFs gravados em disco pelo hash do conteúdo, com metadados na coleção `curriculos`."""
+
+    def __init__(self, collection, base_dir: str = RESUME_STORE_DIR):
+        self.collection = collection
+        self.base_dir = base_dir
+
+    def path_for(self, content_hash: str) -> str:
+        return os.path.join(self.base_dir, content_hash[:2], f"{content_hash}.pdf")
+
+    def _write(self, content_hash: str, pdf: bytes) -> str:
+        path = self.path_for(content_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pdf)
+            os.replace(tmp_path, path)
+        return path
+
+    async def save(self, entrada_hash: str, pdf: bytes, metadados: dict) -> dict:
+        content_hash = hashlib.sha256(pdf).hexdigest()
+        await asyncio.to_thread(self._write, content_hash, pdf)
+        documento = {
+            **metadados,
+            "input_hash": entrada_hash,
+            "content_hash": content_hash,
+            "tamanho": len(pdf),
+            "criado_em": datetime.utcnow(),
+        }
+        await self.collection.update_one({"input_hash": entrada_hash}, {"$set": documento}, upsert=True)
+        return documento
+
+    async def find_by_input(self, entrada_hash: str) -> Optional[dict]:
+        documento = await self.collection.find_one({"input_hash": entrada_hash, "parcial": {"$ne": True}})
+        if documento is None or not os.path.exists(self.path_for(documento["content_hash"])):
+            return None
+        return documento
+
+    async def find_latest(self, filtro: dict) -> Optional[dict]:
+        documentos = await self.collection.find(filtro).sort("criado_em", -1).limit(1).to_list(1)
+        return documentos[0] if documentos else None
+
+    def response(self, request: Request, documento: dict, nome_arquivo: str, headers: Optional[dict] = None) -> Response:
+        """Resposta com ETag, If-None-Match (304) e Range de um único intervalo (206/416)."""
+        path = self.path_for(documento["content_hash"])
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Arquivo do currículo não encontrado.")
+        etag = f'"{documento["content_hash"]}"'
+        size = os.path.getsize(path)
+        base_headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "private, max-age=0, must-revalidate",
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(nome_arquivo)}",
+            **(headers or {}),
+        }
+        if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        start, end = 0, size - 1
+        status_code = 200
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or if_range == etag):
+            match = _RANGE_RE.match(range_header.strip())
+            if match is None or match.groups() == ("", ""):
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+            first, last = match.groups()
+            if first:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+            else:
+                start = max(0, size - int(last))
+            if start > end or start >= size:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+            status_code = 206
+            base_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+        base_headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            _iter_file(path, start, end), status_code=status_code, media_type="application/pdf", headers=base_headers
+        )
+
+
+def _iter_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
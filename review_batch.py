@@ -0,0 +1,126 @@
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple, Type
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+
+load_dotenv()
+
+AVALIACOES_LOTE_CHUNK = int(os.getenv("AVALIACOES_LOTE_CHUNK", 500))
+AVALIACOES_LOTE_MAX = int(os.getenv("AVALIACOES_LOTE_MAX", 10000))
+
+
+async def iter_ndjson(stream: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Decodifica NDJSON à medida que os bytes chegam; linhas inválidas viram a própria exceção."""
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode(line)
+    if buffer.strip():
+        yield _decode(buffer)
+
+
+def _decode(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+async def iter_list(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+class ReviewImporter:
+    """Importa avaliações em blocos: sentimento em lote e `insert_many` ordenado por bloco.
+
+    `on_insert` recebe os documentos de cada bloco gravado (usado pelos agregados por empresa); só
+    depois que ele termina os documentos recebem `reputacao_contada: True`. Itens além de `max_items`
+    não são lidos: o primeiro excedente vira um erro por item e a resposta sai com `truncado: True`.
+    """
+
+    def __init__(self, collection, engine, model: Type[BaseModel], chunk_size: int = AVALIACOES_LOTE_CHUNK,
+                 max_items: int = AVALIACOES_LOTE_MAX, on_insert: Optional[Callable[[List[dict]], Awaitable[None]]] = None):
+        self.collection = collection
+        self.on_insert = on_insert
+        self.engine = engine
+        self.model = model
+        self.chunk_size = chunk_size
+        self.max_items = max_items
+
+    async def run(self, items: AsyncIterator[Any]) -> dict:
+        start = time.perf_counter()
+        resultados: List[dict] = []
+        chunk: List[Tuple[int, BaseModel]] = []
+        inseridas = 0
+        total = 0
+        truncado = False
+        async for item in items:
+            if total >= self.max_items:
+                # Para de ler aqui: o limite vale antes de qualquer escrita extra, não depois do commit.
+                resultados.append({"indice": total, "erro": f"Máximo de {self.max_items} avaliações por requisição; "
+                                                             "este item e os seguintes foram ignorados."})
+                truncado = True
+                break
+            indice = total
+            total += 1
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                chunk.append((indice, self.model(**item)))
+            except (ValidationError, ValueError, TypeError) as e:
+                resultados.append({"indice": indice, "erro": str(e)})
+            if len(chunk) >= self.chunk_size:
+                inseridas += await self._flush(chunk, resultados)
+                chunk = []
+        if chunk:
+            inseridas += await self._flush(chunk, resultados)
+        resultados.sort(key=lambda resultado: resultado["indice"])
+        elapsed = time.perf_counter() - start
+        return {
+            "total": total,
+            "inseridas": inseridas,
+            "erros": total - inseridas + truncado,
+            "truncado": truncado,
+            "segundos": round(elapsed, 3),
+            "resultados": resultados,
+        }
+
+    async def _flush(self, chunk: List[Tuple[int, BaseModel]], resultados: List[dict]) -> int:
+        try:
+            analises = await self.engine.analyze_batch([avaliacao.comentario for _, avaliacao in chunk])
+        except Exception as e:
+            # Sem modelo local e com o LLM fora, o bloco é gravado sem sentimento em vez de derrubar o lote.
+            erro = getattr(e, "detail", None) or str(e)
+            print(f"Erro ao classificar bloco de {len(chunk)} avaliações: {erro}")
+            analises = [None] * len(chunk)
+        documentos = []
+        agora = datetime.utcnow()
+        for (indice, avaliacao), analise in zip(chunk, analises):
+            avaliacao.sentimento = analise.label if analise is not None else None
+            documentos.append({**avaliacao.dict(), "criado_em": agora, "reputacao_contada": False})
+        await self.collection.insert_many(documentos, ordered=True)
+        if self.on_insert is not None:
+            await self.on_insert(documentos)
+            await self.collection.update_many(
+                {"_id": {"$in": [documento["_id"] for documento in documentos]}},
+                {"$set": {"reputacao_contada": True}},
+            )
+        for (indice, _), analise in zip(chunk, analises):
+            if analise is None:
+                resultados.append({"indice": indice, "sentimento": None, "erro_sentimento": erro})
+                continue
+            resultados.append({
+                "indice": indice,
+                "sentimento": analise.label,
+                "confianca": round(analise.confidence, 3),
+                "fonte": analise.source,
+            })
+        return len(documentos)
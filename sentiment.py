@@ -0,0 +1,246 @@
+import argparse
+import asyncio
+import csv
+import os
+import re
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SENTIMENT_MODEL_PATH = os.getenv("SENTIMENT_MODEL_PATH", "models/sentimento.joblib")
+SENTIMENT_MIN_CONFIDENCE = float(os.getenv("SENTIMENT_MIN_CONFIDENCE", 0.6))
+SENTIMENT_LLM_FALLBACK = os.getenv("SENTIMENT_LLM_FALLBACK", "true").lower() in ("1", "true", "yes")
+SENTIMENT_LLM_BATCH_SIZE = int(os.getenv("SENTIMENT_LLM_BATCH_SIZE", 20))
+SENTIMENT_LLM_CONCURRENCY = int(os.getenv("SENTIMENT_LLM_CONCURRENCY", 4))
+
+LABELS = ("positivo", "negativo", "neutro")
+
+
+def extract_sentiment_label(sentiment_response: str) -> str:
+    sentiment_response = sentiment_response.lower()
+
+    if "positivo" in sentiment_response:
+        return "positivo"
+    elif "negativo" in sentiment_response:
+        return "negativo"
+    elif "neutro" in sentiment_response:
+        return "neutro"
+    else:
+        return "neutro"
+
+
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)\s*[:.)\-]\s*(.+)$")
+
+
+def batch_sentiment_prompt(texts: Sequence[str]) -> str:
+    linhas = "\n".join(f"{index}: {' '.join(text.split())}" for index, text in enumerate(texts, 1))
+    return (
+        "Classifique o sentimento de cada texto abaixo como 'positivo', 'negativo' ou 'neutro'. "
+        "Responda apenas uma linha por texto, no formato 'número: sentimento'.\n" + linhas
+    )
+
+
+def parse_batch_labels(response: str, size: int) -> List[Optional[str]]:
+    """Rótulos de uma resposta numerada ('1: positivo'); posições ausentes ficam None."""
+    labels: List[Optional[str]] = [None] * size
+    for line in response.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match and 1 <= int(match.group(1)) <= size:
+            labels[int(match.group(1)) - 1] = extract_sentiment_label(match.group(2))
+    return labels
+
+
+@dataclass
+class SentimentResult:
+    label: str
+    confidence: float
+    source: str
+
+    def dict(self) -> dict:
+        return asdict(self)
+
+
+class LocalSentimentModel:
+    """Pipeline TF-IDF + regressão logística treinado offline e serializado com joblib."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str]) -> "LocalSentimentModel":
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+
+        pipeline = make_pipeline(
+            TfidfVectorizer(strip_accents="unicode", lowercase=True, ngram_range=(1, 2), sublinear_tf=True),
+            LogisticRegression(C=10.0, max_iter=1000, class_weight="balanced"),
+        )
+        pipeline.fit(list(texts), list(labels))
+        return cls(pipeline)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalSentimentModel":
+        import joblib
+
+        return cls(joblib.load(path))
+
+    def save(self, path: str):
+        import joblib
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(self.pipeline, path)
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        probabilities = self.pipeline.predict_proba(list(texts))
+        classes = self.pipeline.classes_
+        results = []
+        for row in probabilities:
+            best = row.argmax()
+            results.append((str(classes[best]), float(row[best])))
+        return results
+
+
+class SentimentEngine:
+    """Classifica localmente em lote e só consulta o LLM para os textos com baixa confiança.
+
+    Sem modelo treinado em `model_path`, todas as mensagens vão para o `llm_fallback`. Com
+    `llm_batch_fallback`, os textos pendentes vão ao LLM em prompts de até `batch_size` textos,
+    com no máximo `max_concurrency` chamadas simultâneas.
+    """
+
+    def __init__(
+        self,
+        llm_fallback: Optional[Callable[[str], Awaitable[str]]] = None,
+        model_path: Optional[str] = SENTIMENT_MODEL_PATH,
+        min_confidence: float = SENTIMENT_MIN_CONFIDENCE,
+        use_fallback: bool = SENTIMENT_LLM_FALLBACK,
+        model: Optional[LocalSentimentModel] = None,
+        llm_batch_fallback: Optional[Callable[[List[str]], Awaitable[str]]] = None,
+        batch_size: int = SENTIMENT_LLM_BATCH_SIZE,
+        max_concurrency: int = SENTIMENT_LLM_CONCURRENCY,
+    ):
+        self.llm_fallback = llm_fallback
+        self.llm_batch_fallback = llm_batch_fallback
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.model_path = model_path
+        self.min_confidence = min_confidence
+        self.use_fallback = use_fallback
+        self._model = model
+        self._model_loaded = model is not None
+        self.local_predictions = 0
+        self.fallback_calls = 0
+        self.batch_calls = 0
+
+    @property
+    def model(self) -> Optional[LocalSentimentModel]:
+        if not self._model_loaded:
+            self._model_loaded = True
+            if self.model_path and os.path.exists(self.model_path):
+                self._model = LocalSentimentModel.load(self.model_path)
+            else:
+                print(f"Modelo de sentimento não encontrado em {self.model_path}; usando apenas o LLM.")
+        return self._model
+
+    async def analyze(self, text: str) -> SentimentResult:
+        return (await self.analyze_batch([text]))[0]
+
+    async def analyze_batch(self, texts: Sequence[str]) -> List[SentimentResult]:
+        texts = list(texts)
+        if not texts:
+            return []
+        results: List[Optional[SentimentResult]] = [None] * len(texts)
+        model = self.model
+        if model is not None:
+            predictions = await asyncio.to_thread(model.predict, texts)
+            self.local_predictions += len(texts)
+            for index, (label, confidence) in enumerate(predictions):
+                results[index] = SentimentResult(label, confidence, "local")
+
+        has_fallback = self.llm_fallback is not None or self.llm_batch_fallback is not None
+        can_fallback = has_fallback and (self.use_fallback or model is None)
+        pending = [
+            index for index, result in enumerate(results)
+            if result is None or (can_fallback and result.confidence < self.min_confidence)
+        ]
+        if can_fallback and pending:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            if self.llm_batch_fallback is not None and len(pending) > 1:
+                chunks = [pending[offset:offset + self.batch_size] for offset in range(0, len(pending), self.batch_size)]
+                await asyncio.gather(*(self._fallback_batch(texts, chunk, results, semaphore) for chunk in chunks))
+            else:
+                await asyncio.gather(*(self._fallback_one(texts, index, results, semaphore) for index in pending))
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = SentimentResult("neutro", 0.0, "default")
+        return results
+
+    async def _fallback_one(self, texts, index, results, semaphore):
+        if self.llm_fallback is None:
+            return
+        async with semaphore:
+            self.fallback_calls += 1
+            try:
+                response = await self.llm_fallback(texts[index])
+            except Exception:
+                if results[index] is None:
+                    raise
+                return
+        results[index] = SentimentResult(extract_sentiment_label(response), 1.0, "llm")
+
+    async def _fallback_batch(self, texts, chunk, results, semaphore):
+        """Um prompt para o lote; itens que o LLM não devolveu caem no fallback individual."""
+        async with semaphore:
+            self.batch_calls += 1
+            try:
+                response = await self.llm_batch_fallback([texts[index] for index in chunk])
+                labels = parse_batch_labels(response, len(chunk))
+            except Exception as e:
+                print(f"Erro no lote de sentimento ({len(chunk)} textos): {e}")
+                labels = [None] * len(chunk)
+        missing = []
+        for index, label in zip(chunk, labels):
+            if label is None:
+                missing.append(index)
+            else:
+                results[index] = SentimentResult(label, 1.0, "llm")
+        await asyncio.gather(*(self._fallback_one(texts, index, results, semaphore) for index in missing))
+
+    def stats(self) -> dict:
+        return {
+            "model_loaded": self._model is not None,
+            "local_predictions": self.local_predictions,
+            "fallback_calls": self.fallback_calls,
+            "batch_calls": self.batch_calls,
+            "min_confidence": self.min_confidence,
+        }
+
+
+def load_dataset(path: str) -> Tuple[List[str], List[str]]:
+    texts, labels = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            label = extract_sentiment_label(row["sentimento"])
+            texts.append(row["texto"])
+            labels.append(label)
+    return texts, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina o classificador de sentimento local.")
+    parser.add_argument("dataset", nargs="?", default="data/sentimento_seed.csv", help="CSV com colunas texto,sentimento")
+    parser.add_argument("--output", default=SENTIMENT_MODEL_PATH)
+    args = parser.parse_args()
+
+    texts, labels = load_dataset(args.dataset)
+    model = LocalSentimentModel.train(texts, labels)
+    model.save(args.output)
+    print(f"Modelo treinado com {len(texts)} exemplos e salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from cache_utils import TTLLRUCache
+
+load_dotenv()
+
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_WEBHOOK_URL = os.getenv("TWILIO_WEBHOOK_URL")
+TWILIO_VALIDATE_SIGNATURE = os.getenv("TWILIO_VALIDATE_SIGNATURE", "true").lower() in ("1", "true", "yes")
+INBOUND_WORKERS = int(os.getenv("INBOUND_WORKERS", 32))
+INBOUND_QUEUE_SIZE = int(os.getenv("INBOUND_QUEUE_SIZE", 5000))
+INBOUND_DEDUP_TTL = float(os.getenv("INBOUND_DEDUP_TTL", 86400))
+
+
+class InboundQueueFull(Exception):
+    pass
+
+
+def twilio_signature(auth_token: str, url: str, params: Dict[str, str]) -> str:
+    """Assinatura X-Twilio-Signature: HMAC-SHA1 da URL seguida dos pares chave+valor em ordem alfabética."""
+    payload = url + "".join(f"{key}{params[key]}" for key in sorted(params))
+    digest = hmac.new(auth_token.encode("utf-8"), payload.encode("utf-8"), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def validate_twilio_signature(auth_token: Optional[str], url: str, params: Dict[str, str], signature: Optional[str]) -> bool:
+    # Sem token, qualquer um calcularia o HMAC com chave vazia: nunca aceita.
+    if not auth_token or not signature:
+        return False
+    return hmac.compare_digest(twilio_signature(auth_token, url, params), signature)
+
+
+@dataclass
+class InboundMessage:
+    sid: str
+    from_number: str
+    body: str
+    profile_name: str = ""
+    received_at: float = field(default_factory=time.monotonic)
+
+
+def parse_inbound(params: Dict[str, str]) -> InboundMessage:
+    return InboundMessage(
+        sid=params.get("MessageSid") or params.get("SmsMessageSid", ""),
+        from_number=params.get("From", "").removeprefix("whatsapp:"),
+        body=params.get("Body", ""),
+        profile_name=params.get("ProfileName", ""),
+    )
+
+
+class InboundQueue:
+    """Fila de mensagens recebidas pelo webhook, processadas por `workers` tarefas.
+
+    Cada número cai sempre no mesmo shard (um worker por shard), o que preserva a ordem por conversa
+    sem travar as demais. `submit` recusa com InboundQueueFull acima de `maxsize` mensagens pendentes;
+    o webhook responde 503 e a Twilio reenvia depois. MessageSid repetidos são descartados em memória e,
+    entre processos, pela coleção `mensagens_recebidas` (_id = MessageSid).
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[InboundMessage], Awaitable[None]],
+        collection=None,
+        workers: int = INBOUND_WORKERS,
+        maxsize: int = INBOUND_QUEUE_SIZE,
+        dedup_ttl: float = INBOUND_DEDUP_TTL,
+    ):
+        self.handler = handler
+        self.collection = collection
+        self.workers = workers
+        self.maxsize = maxsize
+        self.seen = TTLLRUCache(maxsize=max(maxsize * 20, 10000), ttl=dedup_ttl)
+        self._shards: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self.pending = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.queue_seconds = 0.0
+        self.handler_seconds = 0.0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._shards = [asyncio.Queue() for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(shard)) for shard in self._shards]
+
+    def submit(self, message: InboundMessage) -> bool:
+        """Enfileira sem esperar; retorna False para MessageSid já visto."""
+        if message.sid and self.seen.get(message.sid) is not None:
+            self.duplicates += 1
+            return False
+        if self.pending >= self.maxsize:
+            self.rejected += 1
+            raise InboundQueueFull("Fila de mensagens recebidas cheia.")
+        if message.sid:
+            self.seen.set(message.sid, True)
+        shard = zlib.crc32(message.from_number.encode("utf-8")) % len(self._shards)
+        self._shards[shard].put_nowait(message)
+        self.pending += 1
+        self.accepted += 1
+        return True
+
+    async def _claim(self, message: InboundMessage) -> bool:
+        if self.collection is None or not message.sid:
+            return True
+        try:
+            await self.collection.insert_one(
+                {"_id": message.sid, "numero": message.from_number, "recebida_em": datetime.utcnow()}
+            )
+        except DuplicateKeyError:
+            self.duplicates += 1
+            return False
+        return True
+
+    async def _worker(self, shard: asyncio.Queue):
+        while True:
+            message = await shard.get()
+            started = time.monotonic()
+            self.queue_seconds += started - message.received_at
+            try:
+                if await self._claim(message):
+                    await self.handler(message)
+                    self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Erro ao processar mensagem {message.sid} de {message.from_number}: {e}")
+            finally:
+                self.handler_seconds += time.monotonic() - started
+                self.pending -= 1
+                shard.task_done()
+
+    async def join(self):
+        await asyncio.gather(*(shard.join() for shard in self._shards))
+
+    async def close(self, timeout: float = 10.0):
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"{self.pending} mensagens recebidas não processadas no desligamento.")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        finished = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "maxsize": self.maxsize,
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_queue_ms": self.queue_seconds / finished * 1000 if finished else 0.0,
+            "avg_handler_ms": self.handler_seconds / finished * 1000 if finished else 0.0,
+        }
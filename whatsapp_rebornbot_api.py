@@ -1,82 +1,137 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
 from pydantic import BaseModel, EmailStr
-from datetime import datetime, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
-import bcrypt
-import motor.motor_asyncio
-from pymongo import MongoClient
+from datetime import timedelta
 import os
-import smtplib
+import re
+import asyncio
 from email.message import EmailMessage
 from email.utils import formataddr
+from urllib.parse import parse_qsl
 from dotenv import load_dotenv
-from twilio.rest import Client
-import openai
-import time
-from typing import Optional
+from typing import AsyncIterator, List, Optional
 from pydantic import BaseModel, EmailStr, Field  
 from bson import ObjectId
-from pymongo.collection import Collection 
+from pymongo.errors import DuplicateKeyError
 from contextlib import asynccontextmanager
+from password_hashing import password_hasher
+from cache_utils import TTLLRUCache
+from mailer import mailer, MailQueueFull
+from whatsapp_sender import whatsapp_dispatcher
+from llm_client import llm_client, LLMRateLimitError, CircuitOpenError
+from sentiment import SentimentEngine, extract_sentiment_label
+from mongo_indexes import IndexManager, register_conversas, register_mensagens_recebidas, register_users
+from conversation import ConversationStore
+from whatsapp_inbound import (
+    INBOUND_DEDUP_TTL,
+    TWILIO_VALIDATE_SIGNATURE,
+    TWILIO_WEBHOOK_URL,
+    InboundMessage,
+    InboundQueue,
+    InboundQueueFull,
+    parse_inbound,
+    validate_twilio_signature,
+)
+from database import database
+from auth import decode_token, encode_token
+from json_response import ORJSONResponse
+from metrics import MetricsMiddleware, metrics_response
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-app = FastAPI(
-    title="Reborn Technology - Xbot WhatsApp",
-    description="API para gerenciar usuários e autenticação. Integra o XBot para WhatsApp.",
-    version="1.0.0"
-)
-
-MONGO_URI = os.getenv("MONGO_URI")
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-DATABASE_NAME = os.getenv("DATABASE_NAME")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+WHATSAPP_DATABASE_NAME = os.getenv("WHATSAPP_DATABASE_NAME", "UserDatabase")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
 SMTP_USER = os.getenv("SMTP_MAIL")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-USER_COLLECTION_NAME = os.getenv("USER_COLLECTION_NAME")
+USER_COLLECTION_NAME = os.getenv("USER_COLLECTION_NAME", "users")
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+WHATSAPP_STREAM_REPLIES = os.getenv("WHATSAPP_STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+WHATSAPP_MAX_CHARS = 1500
+WHATSAPP_CHUNK_CHARS = min(int(os.getenv("WHATSAPP_CHUNK_CHARS", 320)), WHATSAPP_MAX_CHARS)
+
+USER_PROJECTION = {"_id": 0, "username": 1, "email": 1, "name": 1, "whatsapp_number": 1, "is_active": 1}
+LOGIN_PROJECTION = {"username": 1, "password": 1}
+
+user_cache = TTLLRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+db = database.get_database(WHATSAPP_DATABASE_NAME)
+users_collection = db[USER_COLLECTION_NAME]
+index_manager = IndexManager(db)
+register_users(index_manager, USER_COLLECTION_NAME)
+register_conversas(index_manager)
+register_mensagens_recebidas(index_manager, INBOUND_DEDUP_TTL)
+
+async def summarize_conversation(previous_summary: str, turns: list) -> str:
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    prompt = (
+        f"Atualize o resumo de uma conversa de WhatsApp em no máximo 5 frases, mantendo nomes, pedidos e "
+        f"compromissos. Resumo anterior: {previous_summary or 'nenhum'}.\nNovas mensagens:\n{transcript}"
+    )
+    summary = await llm_client.chat_completion([{"role": "user", "content": prompt}], temperature=0.2)
+    return summary.strip()
 
+conversation_store = ConversationStore(db, summarize=summarize_conversation)
 
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME] 
+async def handle_inbound(message: InboundMessage):
+    await reply_to_message(message.from_number, message.body, message.profile_name or message.from_number)
 
-async def get_users_collection():
-    client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI) 
-    db = client[DATABASE_NAME]  
-    return db[USER_COLLECTION_NAME]  
+inbound_queue = InboundQueue(handle_inbound, collection=db.mensagens_recebidas)
 
-@app.on_event("startup")
-async def startup_event():
-    app.state.db_client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     try:
-        await app.state.db_client.admin.command('ping')
-        app.state.users_collection = app.state.db_client['UserDatabase']['users']
-        print("Conexão com MongoDB estabelecida com sucesso.")
+        await database.connect()
     except Exception as e:
         print(f"Erro ao conectar ao MongoDB: {e}")
-        raise HTTPException(status_code=500, detail="Erro ao conectar ao MongoDB")
+        raise
+    await index_manager.bootstrap()
+    await mailer.start()
+    await whatsapp_dispatcher.start()
+    await llm_client.start()
+    password_hasher.start()
+    inbound_queue.start()
+    yield
+    await inbound_queue.close()
+    await conversation_store.close()
+    password_hasher.close()
+    await mailer.close()
+    await whatsapp_dispatcher.close()
+    await llm_client.close()
+    database.close()
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    client = app.state.db_client
-    if client:
-        client.close()
-        print("Conexão com MongoDB fechada.")
+app = FastAPI(
+    title="Reborn Technology - Xbot WhatsApp",
+    description="API para gerenciar usuários e autenticação. Integra o XBot para WhatsApp.",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+app.add_middleware(MetricsMiddleware, app_name="whatsapp")
+router = APIRouter(default_response_class=ORJSONResponse)
+ops_router = APIRouter(default_response_class=ORJSONResponse)
 
-@app.get("/")
+@router.get("/")
 async def read_root():
     return {"message": "Bem-vindo à API Reborn Technology!"}
 
+@ops_router.get("/db/stats")
+async def db_stats():
+    return database.stats()
+
+@ops_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return metrics_response()
+
 async def get_users_collection():
-    return app.state.users_collection
+    return users_collection
 
 class UserBase(BaseModel):
     id: Optional[str] = None  
@@ -98,6 +153,13 @@ class UserBase(BaseModel):
 class UserRegister(UserBase):
     password: str
 
+class UserPublic(BaseModel):
+    username: str
+    email: EmailStr
+    name: str
+    whatsapp_number: Optional[str] = None
+    is_active: bool = False
+
 class UserLogin(BaseModel):
    username: str
    email: EmailStr
@@ -118,59 +180,44 @@ class ActivationRequest(BaseModel):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-@app.get("/items/{item_id}", summary="Get an item by ID", description="Retrieve an item from the inventory using its unique ID.")
+@router.get("/items/{item_id}", summary="Get an item by ID", description="Retrieve an item from the inventory using its unique ID.")
 async def read_item(item_id: int):
     return {"item_id": item_id}
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encode_token(data, expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), ALGORITHM)
 class ResendActivationRequest(BaseModel):
     username: str
 
+class BroadcastRequest(BaseModel):
+    to_numbers: List[str]
+    message: str
+
 def validate_whatsapp_number(number: str) -> bool:
     return number.startswith("+") and number[1:].isdigit() and 10 <= len(number[1:]) <= 15
 
-def send_whatsapp_message(to_number: str, message: str):
-    if not validate_whatsapp_number(to_number):
-        raise HTTPException(status_code=400, detail="Número de WhatsApp inválido.")
-    
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-    try:
-        message = client.messages.create(
-            body=message,
-            from_=f'whatsapp:{TWILIO_WHATSAPP_NUMBER}',
-            to=f'whatsapp:{to_number}'
-        )
-        print(f"Mensagem enviada com sucesso para {to_number}: {message.sid}")
-    except Exception as e:
-        print(f"Erro ao enviar mensagem: {e}")
-        raise HTTPException(status_code=500, detail="Erro ao enviar mensagem no WhatsApp.")
-
-async def get_user_by_username(username: str):
+async def get_user_by_username(username: str, projection: Optional[dict] = None):
     users_collection = await get_users_collection()  
-    return await users_collection.find_one({'username': username})  
+    return await users_collection.find_one({'username': username}, projection or USER_PROJECTION)
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+    payload = decode_token(token, ALGORITHM)
+    username: str = payload.get("sub") if payload else None
+    if username is None:
+        raise credentials_exception
+    user = user_cache.get(username)
+    if user is None:
         user = await get_user_by_username(username)
         if user is None:
             raise credentials_exception
-        return user
-    except JWTError:
-        raise credentials_exception
+        user_cache.set(username, user, payload.get("exp"))
+    return user
 
-def send_email(to_email: str, subject: str, user_name: str, activation_code: str):
+async def send_email(to_email: str, subject: str, user_name: str, activation_code: str):
     email_body = f"""
     <!DOCTYPE html>
     <html lang="en">
@@ -212,50 +259,59 @@ def send_email(to_email: str, subject: str, user_name: str, activation_code: str
     msg['To'] = to_email
 
     try:
-        with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT) as server:
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(msg)
-    except Exception as e:
+        await mailer.enqueue(msg)
+    except MailQueueFull as e:
         print(f"Erro ao enviar e-mail: {e}")
-        raise HTTPException(status_code=500, detail="Erro ao enviar e-mail")
+        raise HTTPException(status_code=503, detail="Fila de e-mails cheia. Tente novamente mais tarde.")
 
-@app.post("/register", response_model=Token)
+@router.post("/register", response_model=Token)
 async def register(user: UserRegister):
-    existing_user = await get_user_by_username(user.username)
+    existing_user = await get_user_by_username(user.username, {"_id": 1})
     if existing_user:
         raise HTTPException(status_code=400, detail="Usuário já existe")
     
     if not validate_whatsapp_number(user.whatsapp_number):
         raise HTTPException(status_code=400, detail="Número de WhatsApp inválido")
 
-    hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt())
+    hashed_password = await password_hasher.hash(user.password)
     activation_code = str(os.urandom(3).hex()) 
     users_collection = await get_users_collection()
     
-    await users_collection.insert_one({
-        **user.model_dump(),  
-        "password": hashed_password.decode('utf-8'),  
-        "activation_code": activation_code,
-        "_id": ObjectId()  
-    })
+    try:
+        await users_collection.insert_one({
+            **user.model_dump(),
+            "password": hashed_password,
+            "activation_code": activation_code,
+            "_id": ObjectId()
+        })
+    except DuplicateKeyError as e:
+        raise HTTPException(status_code=400, detail="E-mail já cadastrado" if "email" in str(e) else "Usuário já existe")
+    user_cache.invalidate(user.username)
     
-    send_email(user.email, "Código de Ativação", user.name, activation_code)
+    await send_email(user.email, "Código de Ativação", user.name, activation_code)
 
     access_token = create_access_token(data={"sub": user.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/token", response_model=Token)
+@router.post("/token", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = await get_user_by_username(form_data.username)
-    if user is None or not bcrypt.checkpw(form_data.password.encode('utf-8'), user['password']):
+    user = await get_user_by_username(form_data.username, LOGIN_PROJECTION)
+    if user is None:
+        raise HTTPException(status_code=400, detail="Usuário ou senha inválidos")
+    valid, new_hash = await password_hasher.verify_and_update(form_data.password, user['password'])
+    if not valid:
         raise HTTPException(status_code=400, detail="Usuário ou senha inválidos")
+    if new_hash:
+        users_collection = await get_users_collection()
+        await users_collection.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+        user_cache.invalidate(form_data.username)
     
     access_token = create_access_token(data={"sub": form_data.username})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/activate", response_model=dict)
+@router.post("/activate", response_model=dict)
 async def activate_user(activation_request: ActivationRequest):
-    user = await get_user_by_username(activation_request.username)
+    user = await get_user_by_username(activation_request.username, {"activation_code": 1})
     if user is None or user['activation_code'] != activation_request.activation_code:
         raise HTTPException(status_code=400, detail="Código de ativação inválido ou usuário não encontrado")
     
@@ -265,104 +321,212 @@ async def activate_user(activation_request: ActivationRequest):
         {"username": activation_request.username}, 
         {"$set": {"is_active": True, "activation_code": None}}
     )
+    user_cache.invalidate(activation_request.username)
     
     return {"message": "Conta ativada com sucesso."}
 
-@app.post("/send-message/")
+@router.post("/send-message/")
 async def send_message(to_number: str, message: str, current_user: dict = Depends(get_current_user)):
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuário não autenticado.")
-    
+
+    results = await reply_to_message(to_number, message, current_user['name'])
+    return {
+        "message": "Mensagem enviada com sucesso!",
+        "sid": results[0].sid,
+        "status": results[-1].status,
+        "sids": [result.sid for result in results],
+    }
+
+@router.post("/webhook/twilio", summary="Receber mensagens do WhatsApp (webhook da Twilio)")
+async def twilio_webhook(request: Request):
+    params = dict(parse_qsl((await request.body()).decode("utf-8"), keep_blank_values=True))
+    if TWILIO_VALIDATE_SIGNATURE:
+        if not TWILIO_AUTH_TOKEN:
+            print("Webhook da Twilio recusado: TWILIO_AUTH_TOKEN não configurado.")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook da Twilio não configurado.")
+        url = TWILIO_WEBHOOK_URL or str(request.url)
+        if not validate_twilio_signature(TWILIO_AUTH_TOKEN, url, params, request.headers.get("X-Twilio-Signature")):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Assinatura da Twilio inválida.")
+
+    message = parse_inbound(params)
+    if message.from_number and message.body.strip():
+        try:
+            inbound_queue.submit(message)
+        except InboundQueueFull as e:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+    return Response(content="<Response></Response>", media_type="application/xml")
+
+async def reply_to_message(to_number: str, message: str, username: str) -> list:
+    """Sentimento, histórico, resposta do LLM e envio; usado por /send-message/ e pelo webhook."""
+    if not validate_whatsapp_number(to_number):
+        raise HTTPException(status_code=400, detail="Número de WhatsApp inválido.")
     try:
-        sentiment_analysis = await analyze_sentiment_with_openai(message)
+        sentiment_analysis = await sentiment_engine.analyze(message)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao analisar sentimento: {str(e)}")
 
+    sentiment_label = sentiment_analysis.label
+    history = await conversation_store.context(to_number)
+    await conversation_store.append(to_number, "user", message)
 
-    sentiment_label = sentiment_analysis.get("label", "neutro")
-
-    
-    response_message = await get_openai_chat_completion(message, sentiment_label, [], current_user['name'])
-
-    send_whatsapp_message(to_number, response_message)
-    return {"message": "Mensagem enviada com sucesso!"}
+    if WHATSAPP_STREAM_REPLIES:
+        parts = []
+        results = await send_streamed_reply(
+            to_number, collect_deltas(stream_openai_chat_completion(message, sentiment_label, history, username), parts)
+        )
+        await conversation_store.append(to_number, "assistant", "".join(parts).strip())
+        return results
+
+    response_message = await get_openai_chat_completion(message, sentiment_label, history, username)
+    result = await send_whatsapp_message(to_number, response_message)
+    await conversation_store.append(to_number, "assistant", response_message)
+    return [result]
+
+@router.post("/send-bulk/")
+async def send_bulk(request: BroadcastRequest, current_user: dict = Depends(get_current_user)):
+    invalid = [number for number in request.to_numbers if not validate_whatsapp_number(number)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Números de WhatsApp inválidos: {', '.join(invalid)}")
+    results = await whatsapp_dispatcher.send_bulk((number, request.message) for number in request.to_numbers)
+    return {
+        "sent": sum(1 for result in results if result.sid),
+        "failed": sum(1 for result in results if result.status == "failed"),
+        "unknown": sum(1 for result in results if result.status == "unknown"),
+        "results": [result.dict() for result in results],
+    }
 
 async def analyze_sentiment_with_openai(message: str):
     prompt = (
         f"Analise o sentimento da seguinte mensagem e classifique como 'positivo', 'negativo' ou 'neutro': {message}"
     )
 
-    max_retries = 3
-    delay_between_attempts = 120  
-    for attempt in range(max_retries):
-        try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            sentiment_response = response.choices[0].message.content.strip()
-            sentiment_label = extract_sentiment_label(sentiment_response)
-            return {"label": sentiment_label}
-        except openai.error.RateLimitError:
-            if attempt < max_retries - 1:
-                time.sleep(delay_between_attempts)  
-                continue  
-            else:
-                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Limite de taxa excedido. Tente novamente mais tarde.")
-        except Exception as e:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao chamar a API: {str(e)}")
-
-def extract_sentiment_label(sentiment_response: str) -> str:
-    sentiment_response = sentiment_response.lower()  
-
-    if "positivo" in sentiment_response:
-        return "positivo"
-    elif "negativo" in sentiment_response:
-        return "negativo"
-    elif "neutro" in sentiment_response:
-        return "neutro"
-    else:
-        return "neutro"  
-async def get_openai_chat_completion(message: str, sentiment_label: str, history: list, username: str) -> str:
-    context_prompt = (
+    try:
+        sentiment_response = await llm_client.chat_completion([{"role": "user", "content": prompt}])
+    except (LLMRateLimitError, CircuitOpenError) as e:
+        raise llm_unavailable_exception(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao chamar a API: {str(e)}")
+    return {"label": extract_sentiment_label(sentiment_response.strip())}
+
+def llm_unavailable_exception(error: Exception) -> HTTPException:
+    headers = {"Retry-After": str(int(error.retry_after or 1))} if getattr(error, "retry_after", None) else None
+    if isinstance(error, CircuitOpenError):
+        return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Serviço de IA temporariamente indisponível. Tente novamente mais tarde.", headers=headers)
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Limite de taxa excedido. Tente novamente mais tarde.", headers=headers)
+
+async def classify_sentiment_with_openai(message: str) -> str:
+    sentiment_analysis = await analyze_sentiment_with_openai(message)
+    return sentiment_analysis["label"]
+
+sentiment_engine = SentimentEngine(llm_fallback=classify_sentiment_with_openai)
+
+def build_chat_messages(message: str, sentiment_label: str, history: list, username: str) -> list:
+    system_prompt = (
         f"Você é um assistente virtual que responde de forma amigável e útil. "
-        f"Considerando o sentimento da mensagem '{message}' que é '{sentiment_label}', "
+        f"O sentimento da mensagem atual é '{sentiment_label}'; "
         f"responda de maneira apropriada, levando em conta o contexto e o tom da conversa. "
-        f"Histórico da conversa: {history}. "
         f"Usuário: {username}"
     )
+    return [{"role": "system", "content": system_prompt}, *history, {"role": "user", "content": message}]
+
+async def get_openai_chat_completion(message: str, sentiment_label: str, history: list, username: str) -> str:
+    messages = build_chat_messages(message, sentiment_label, history, username)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": context_prompt}]
-        )
-        return response.choices[0].message.content.strip()
+        response = await llm_client.chat_completion(messages)
+        return response.strip()
+    except (LLMRateLimitError, CircuitOpenError) as e:
+        raise llm_unavailable_exception(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao obter resposta da API: {str(e)}")
     
-def send_whatsapp_message(to_number: str, response_message: str):
+async def stream_openai_chat_completion(
+    message: str, sentiment_label: str, history: list, username: str
+) -> AsyncIterator[str]:
+    messages = build_chat_messages(message, sentiment_label, history, username)
+    try:
+        async for delta in llm_client.stream_chat_completion(messages):
+            yield delta
+    except (LLMRateLimitError, CircuitOpenError) as e:
+        raise llm_unavailable_exception(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao obter resposta da API: {str(e)}")
+
+async def collect_deltas(deltas: AsyncIterator[str], parts: list) -> AsyncIterator[str]:
+    async for delta in deltas:
+        parts.append(delta)
+        yield delta
+
+SENTENCE_END = re.compile(r"[.!?…](?=\s)|\n")
+
+def split_reply(buffer: str) -> tuple:
+    """Corta `buffer` no último fim de frase; sem fim de frase, só corta ao atingir o limite do WhatsApp."""
+    window = buffer[:WHATSAPP_MAX_CHARS]
+    cut = None
+    for match in SENTENCE_END.finditer(window):
+        cut = match.end()
+    if cut is None:
+        if len(buffer) < WHATSAPP_MAX_CHARS:
+            return None, buffer
+        cut = window.rfind(" ") + 1 or WHATSAPP_MAX_CHARS
+    return buffer[:cut].strip(), buffer[cut:]
+
+async def send_streamed_reply(to_number: str, deltas: AsyncIterator[str]) -> list:
+    """Envia a resposta em partes, na ordem, enquanto o LLM ainda está gerando o restante."""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def sender():
+        results = []
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                return results
+            results.append(await send_whatsapp_message(to_number, chunk))
+
+    task = asyncio.create_task(sender())
+    buffer = ""
+    try:
+        async for delta in deltas:
+            if task.done():
+                break
+            buffer += delta
+            while len(buffer) >= WHATSAPP_CHUNK_CHARS:
+                chunk, buffer = split_reply(buffer)
+                if chunk is None:
+                    break
+                if chunk:
+                    queue.put_nowait(chunk)
+        while buffer.strip():
+            chunk, buffer = split_reply(buffer)
+            if chunk is None:
+                chunk, buffer = buffer.strip(), ""
+            if chunk:
+                queue.put_nowait(chunk)
+    except BaseException:
+        task.cancel()
+        raise
+    queue.put_nowait(None)
+    results = await task
+    if not results:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Resposta vazia da API.")
+    return results
+
+async def send_whatsapp_message(to_number: str, response_message: str):
     if not validate_whatsapp_number(to_number):
         raise HTTPException(status_code=400, detail="Número de WhatsApp inválido.")
-    
-    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 
-    try:
-        message = client.messages.create(
-            body=response_message,
-            from_=f'whatsapp:{TWILIO_WHATSAPP_NUMBER}', 
-            to=f'whatsapp:{to_number}'  
-        )
-        print(f"Mensagem enviada com sucesso para {to_number}: {message.sid}")
-    except Exception as e:
-        print(f"Erro ao enviar mensagem: {e}")
+    result = await whatsapp_dispatcher.send(to_number, response_message)
+    if result.sid is None:
+        print(f"Erro ao enviar mensagem: {result.error}")
         raise HTTPException(status_code=500, detail="Erro ao enviar mensagem no WhatsApp.")
+    print(f"Mensagem enviada com sucesso para {to_number}: {result.sid}")
+    return result
 
-def validate_whatsapp_number(number: str) -> bool:
-    return number.startswith("+") and number[1:].isdigit() and 10 <= len(number[1:]) <= 15
 
-
-@app.post("/resend-activation", response_model=dict)
+@router.post("/resend-activation", response_model=dict)
 async def resend_activation(request: ResendActivationRequest):
     user = await get_user_by_username(request.username)
     if user is None:
@@ -375,14 +539,47 @@ async def resend_activation(request: ResendActivationRequest):
         {"username": request.username}, 
         {"$set": {"activation_code": activation_code}}
     )
+    user_cache.invalidate(request.username)
     
-    send_email(user['email'], "Novo Código de Ativação", user['name'], activation_code)
+    await send_email(user['email'], "Novo Código de Ativação", user['name'], activation_code)
     return {"message": "Código de ativação reenviado com sucesso."}
 
 
-@app.get("/users/me", response_model=UserBase)
-async def read_users_me(current_user: UserBase = Depends(get_current_user)):
-    return current_user
+@router.get("/sentiment/stats")
+async def sentiment_stats():
+    return sentiment_engine.stats()
+
+@ops_router.get("/llm/stats")
+async def llm_stats():
+    return llm_client.stats()
+
+@router.get("/whatsapp/stats")
+async def whatsapp_stats():
+    return whatsapp_dispatcher.stats()
+
+@router.get("/conversations/stats")
+async def conversation_stats():
+    return conversation_store.stats()
+
+@router.get("/inbound/stats")
+async def inbound_stats():
+    return inbound_queue.stats()
+
+@router.get("/mail/stats")
+async def mail_stats():
+    return mailer.stats()
+
+@ops_router.get("/cache/users")
+async def user_cache_stats():
+    return user_cache.stats()
+
+@router.get("/users/me", response_model=UserPublic)
+async def read_users_me(current_user: dict = Depends(get_current_user)):
+    # USER_PROJECTION já deixa de fora senha, código de ativação e _id.
+    return ORJSONResponse(current_user)
+
+app.include_router(router)
+app.include_router(ops_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import BasicAuth, ClientConnectorError, ClientSession, ClientTimeout, ConnectionTimeoutError, TCPConnector
+from dotenv import load_dotenv
+
+from metrics import track
+
+load_dotenv()
+
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
+TWILIO_API_BASE = os.getenv("TWILIO_API_BASE", "https://api.twilio.com")
+TWILIO_MESSAGES_PER_SECOND = float(os.getenv("TWILIO_MESSAGES_PER_SECOND", 80))
+TWILIO_MAX_CONCURRENCY = int(os.getenv("TWILIO_MAX_CONCURRENCY", 50))
+TWILIO_MAX_RETRIES = int(os.getenv("TWILIO_MAX_RETRIES", 3))
+TWILIO_TIMEOUT = float(os.getenv("TWILIO_TIMEOUT", 15))
+
+
+class TokenBucket:
+    """Limitador token bucket: até `rate` envios por segundo com rajadas de até `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class SendResult:
+    to: str
+    sid: Optional[str] = None
+    status: str = "failed"
+    error: Optional[str] = None
+    attempts: int = 0
+
+    def dict(self) -> dict:
+        return asdict(self)
+
+
+class WhatsAppDispatcher:
+    """Envia mensagens de WhatsApp pela API REST da Twilio com um único cliente HTTP assíncrono."""
+
+    def __init__(
+        self,
+        account_sid: Optional[str] = TWILIO_ACCOUNT_SID,
+        auth_token: Optional[str] = TWILIO_AUTH_TOKEN,
+        from_number: Optional[str] = TWILIO_WHATSAPP_NUMBER,
+        api_base: str = TWILIO_API_BASE,
+        messages_per_second: float = TWILIO_MESSAGES_PER_SECOND,
+        max_concurrency: int = TWILIO_MAX_CONCURRENCY,
+        max_retries: int = TWILIO_MAX_RETRIES,
+        timeout: float = TWILIO_TIMEOUT,
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.url = f"{api_base}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.messages_per_second = messages_per_second
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = ClientTimeout(total=timeout)
+        self._session: Optional[ClientSession] = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.sent = 0
+        self.failed = 0
+        self.unknown = 0
+        self.retries = 0
+
+    async def start(self):
+        if self._session is not None and not self._session.closed:
+            return
+        self._session = ClientSession(
+            connector=TCPConnector(limit=self.max_concurrency, keepalive_timeout=30),
+            auth=BasicAuth(self.account_sid or "", self.auth_token or ""),
+            timeout=self.timeout,
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _bucket(self, from_number: str) -> TokenBucket:
+        bucket = self._buckets.get(from_number)
+        if bucket is None:
+            bucket = self._buckets[from_number] = TokenBucket(self.messages_per_second)
+        return bucket
+
+    async def send(self, to_number: str, body: str, from_number: Optional[str] = None) -> SendResult:
+        from_number = from_number or self.from_number
+        if self._session is None or self._session.closed:
+            await self.start()
+        result = SendResult(to=to_number)
+        data = {"From": f"whatsapp:{from_number}", "To": f"whatsapp:{to_number}", "Body": body}
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            retry_after = None
+            async with self._semaphore:
+                await self._bucket(from_number).acquire()
+                try:
+                    with track("twilio", "send_message") as call:
+                        async with self._session.post(self.url, data=data) as response:
+                            try:
+                                payload = await response.json(content_type=None)
+                            except ValueError:
+                                payload = {}
+                            if response.status < 400:
+                                result.sid = payload.get("sid")
+                                result.status = payload.get("status", "queued") if result.sid else "unknown"
+                                result.error = None
+                                self.sent += 1
+                                return result
+                            call.fail()
+                            result.error = f"{response.status}: {payload.get('message', payload)}"
+                            if response.status != 429 and response.status < 500:
+                                break
+                            retry_after = response.headers.get("Retry-After")
+                except (ClientConnectorError, ConnectionTimeoutError) as e:
+                    # A conexão nem chegou a abrir: a Twilio não recebeu nada e reenviar é seguro.
+                    result.error = repr(e)
+                except asyncio.TimeoutError as e:
+                    # A requisição pode ter sido aceita; reenviar arriscaria mensagem duplicada.
+                    result.status = "unknown"
+                    result.error = repr(e)
+                    self.unknown += 1
+                    return result
+                except Exception as e:
+                    result.error = repr(e)
+                    break
+            if attempt < self.max_retries:
+                self.retries += 1
+                await asyncio.sleep(_retry_delay(attempt, retry_after))
+        self.failed += 1
+        return result
+
+    async def send_bulk(self, messages: Iterable[Tuple[str, str]]) -> List[SendResult]:
+        return await asyncio.gather(*(self.send(to_number, body) for to_number, body in messages))
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "unknown": self.unknown,
+            "retries": self.retries,
+            "messages_per_second": self.messages_per_second,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str]) -> float:
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+whatsapp_dispatcher = WhatsAppDispatcher()